@@ -0,0 +1,57 @@
+"""Compares the encode+ground wall time of adding the facts through the text path
+(as_program_string + Control.add) against Dafacter.add_to_control, both from scratch and
+reusing the facts already cached by a previous as_clingo_facts call.
+
+Usage: python benchmarks/bench_add_to_control.py [n_rows] [n_columns]
+"""
+import os
+import sys
+from time import perf_counter
+
+# Runs from a checkout without installing dafact
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clingo import Control
+from numpy.random import default_rng
+
+from dafact import Dafacter
+
+RULES = 'low(I) :- value(I, "f1", V), V < 50. #show low/1.'
+
+
+def text_path(dafacter):
+    ctl = Control()
+    ctl.add("base", [], dafacter.as_program_string())
+    ctl.add("base", [], RULES)
+    ctl.ground([("base", [])])
+    return ctl
+
+
+def control_path(dafacter):
+    ctl = Control()
+    dafacter.add_to_control(ctl)
+    ctl.add("base", [], RULES)
+    ctl.ground([("base", [])])
+    return ctl
+
+
+def main(n_rows=100000, n_columns=10):
+    data = default_rng(0).integers(0, 100, size=(n_rows, n_columns))
+    for name, path in (("text", text_path), ("add_to_control", control_path)):
+        # A fresh Dafacter so that no cache is reused between paths
+        dafacter = Dafacter(data)
+        start = perf_counter()
+        path(dafacter)
+        print(f"{name:>21}: {perf_counter() - start:.3f}s "
+              f"({n_rows} rows x {n_columns} columns)")
+
+    dafacter = Dafacter(data)
+    dafacter.as_clingo_facts()
+    start = perf_counter()
+    control_path(dafacter)
+    print(f"{'add_to_control cached':>21}: {perf_counter() - start:.3f}s "
+          f"({n_rows} rows x {n_columns} columns)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,164 @@
+"""Throughput and memory benchmark of the encoders, on synthetic data.
+
+Every case runs in a fresh process so its peak RSS is not polluted by the previous ones (csv
+files are written beforehand in another process, so csv cases never hold the data). Results
+are printed as JSON (or written to --output), so they can be compared between releases.
+
+Usage: python benchmarks/bench_encoders.py [--rows 10000 100000] [--columns 10 40]
+                                          [--factors 0 2] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from itertools import product
+from multiprocessing import get_context
+from time import perf_counter
+
+import numpy as np
+
+# Runs from a checkout without installing dafact (spawned cases import this module too)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SOURCES = ('numpy', 'csv')
+OUTPUTS = ('text', 'facts')
+MIXES = ('numerical', 'mixed', 'categorical')
+
+
+def numerical_columns_of(n_columns, mix):
+    """Returns the numerical_columns given to the encoders for a mix of column kinds."""
+    return None if mix == 'numerical' else list(range(0, n_columns, 2))
+
+
+def synthetic_data(n_rows, n_columns, mix, seed=0):
+    """Returns (data, numerical_columns) for a mix of column kinds:
+        - numerical: every column holds floats.
+        - mixed: half the columns hold floats, the other half small non numerical ints.
+        - categorical: as mixed, but a quarter of the columns hold strings.
+    """
+    rng = np.random.default_rng(seed)
+    data = rng.normal(50, 20, size=(n_rows, n_columns))
+    numerical_columns = numerical_columns_of(n_columns, mix)
+    if mix == 'numerical':
+        return data, numerical_columns
+
+    data[:, 1::2] = rng.integers(0, 10, size=(n_rows, len(range(1, n_columns, 2))))
+    if mix == 'categorical':
+        data = data.astype(object)
+        categories = np.array([f'cat{i}' for i in range(20)], dtype=object)
+        for j in range(3, n_columns, 4):
+            data[:, j] = categories[rng.integers(0, 20, size=n_rows)]
+    return data, numerical_columns
+
+
+def csv_path(case, tmpdir):
+    return os.path.join(tmpdir, f"{case['mix']}_{case['rows']}_{case['columns']}.csv")
+
+
+def write_csv(case, path):
+    data, _ = synthetic_data(case['rows'], case['columns'], case['mix'])
+    np.savetxt(path, data, delimiter=',', fmt='%s')
+
+
+def run_case(case, tmpdir):
+    from dafact.encoders import CsvEncoder, NumpyLikeEncoder
+    from dafact.encoders._stats import _peak_memory
+
+    if case['source'] == 'csv':
+        # The data is only read from the file written by write_csv
+        numerical_columns = numerical_columns_of(case['columns'], case['mix'])
+        start = perf_counter()
+        encoder = CsvEncoder(csv_path(case, tmpdir),
+                             numerical_columns=numerical_columns)
+    else:
+        data, numerical_columns = synthetic_data(case['rows'], case['columns'],
+                                                 case['mix'])
+        start = perf_counter()
+        encoder = NumpyLikeEncoder(data, numerical_columns=numerical_columns)
+
+    if case['output'] == 'text':
+        text = encoder.as_program_string(factor=case['factor'])
+        n_bytes = len(text.encode())
+    else:
+        encoder.as_clingo_facts(factor=case['factor'])
+        n_bytes = None
+    seconds = perf_counter() - start
+    peak_memory = _peak_memory()
+    # One feature fact per column, one instance fact and one value fact per cell for each row
+    n_facts = case['columns'] + case['rows'] * (case['columns'] + 1)
+
+    return dict(
+        case,
+        seconds=seconds,
+        rows_per_sec=case['rows'] / seconds,
+        facts=n_facts,
+        facts_per_sec=n_facts / seconds,
+        bytes=n_bytes,
+        bytes_per_sec=None if n_bytes is None else n_bytes / seconds,
+        peak_rss_mb=None if peak_memory is None else peak_memory / 2**20,
+    )
+
+
+def environment():
+    import clingo
+    import dafact
+    return {
+        'dafact': dafact.__version__,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'clingo': clingo.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--columns', type=int, nargs='+', default=[10, 40])
+    parser.add_argument('--factors', type=int, nargs='+', default=[0, 2])
+    parser.add_argument('--sources', nargs='+', choices=SOURCES, default=SOURCES)
+    parser.add_argument('--outputs', nargs='+', choices=OUTPUTS, default=OUTPUTS)
+    parser.add_argument('--mixes', nargs='+', choices=MIXES, default=MIXES)
+    parser.add_argument('--output', type=str, default=None,
+                        help="JSON file for the results (stdout by default).")
+    args = parser.parse_args()
+
+    cases = [
+        dict(source=source, output=output, rows=rows, columns=columns,
+             factor=factor, mix=mix)
+        for source, output, rows, columns, factor, mix in product(
+            args.sources, args.outputs, args.rows, args.columns,
+            args.factors, args.mixes)
+    ]
+    results = []
+    context = get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for case in cases:
+            path = csv_path(case, tmpdir)
+            if case['source'] == 'csv' and not os.path.exists(path):
+                with context.Pool(1) as pool:
+                    pool.apply(write_csv, (case, path))
+            with context.Pool(1) as pool:
+                result = pool.apply(run_case, (case, tmpdir))
+            results.append(result)
+            peak = result['peak_rss_mb']
+            print(f"{case['source']:>5} {case['output']:>5} {case['mix']:>11} "
+                  f"{case['rows']:>8}x{case['columns']:<3} factor={case['factor']}: "
+                  f"{result['rows_per_sec']:>10.0f} rows/s "
+                  f"{'?' if peak is None else f'{peak:.1f}':>7} MB",
+                  file=sys.stderr)
+
+    report = json.dumps({'environment': environment(), 'results': results},
+                        indent=2)
+    if args.output is None:
+        print(report)
+    else:
+        with open(args.output, 'w') as outfile:
+            outfile.write(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Startup time benchmark: how long short-lived processes take to import dafact and encode a tiny file.
+
+Every scenario runs --repeat times in a fresh interpreter and the median wall time is reported,
+together with the modules each scenario ended up importing. Results are printed as JSON (or
+written to --output), so they can be compared between releases.
+
+Usage: python benchmarks/bench_startup.py [--repeat 20] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+# Scenarios run from the repository root, so a checkout is measured without installing dafact.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules whose import is reported for every scenario.
+HEAVY_MODULES = ('numpy', 'clingo', 'asyncio', 'concurrent.futures')
+
+SCENARIOS = {
+    'python': "pass",
+    'import dafact': "import dafact",
+    'import Dafacter': "from dafact import Dafacter",
+    'cli --help': "import sys; sys.argv = ['dafact', '--help']\n"
+                  "from dafact.__main__ import main\n"
+                  "try:\n    main()\nexcept SystemExit:\n    pass",
+    'cli text': "import sys; sys.argv = ['dafact', {csv!r}, os.devnull]\n"
+                "from dafact.__main__ import main; main()",
+    'facts': "from dafact import Dafacter; Dafacter({csv!r}).as_clingo_facts()",
+}
+
+
+def run(code):
+    """Runs code in a fresh interpreter. Returns its wall time and the heavy modules it imported."""
+    probe = (f"import os, sys\n{code}\n"
+             f"print('modules:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    start = perf_counter()
+    output = subprocess.run([sys.executable, '-c', probe],
+                            check=True,
+                            cwd=ROOT,
+                            capture_output=True,
+                            text=True).stdout
+    seconds = perf_counter() - start
+    modules = output[output.rindex('modules:') + len('modules:'):].strip()
+    return seconds, [m for m in modules.split(',') if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', type=str, default=None,
+                        help="JSON file for the results (stdout by default).")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, 'tiny.csv')
+        with open(csv_path, 'w') as csvfile:
+            csvfile.write('1,2,3\n4,5,6\n')
+        for name, code in SCENARIOS.items():
+            code = code.format(csv=csv_path)
+            runs = [run(code) for _ in range(args.repeat)]
+            seconds = statistics.median(r[0] for r in runs)
+            results.append(dict(scenario=name, seconds=seconds, modules=runs[0][1]))
+            print(f"{name:>16}: {seconds * 1000:7.1f} ms  {' '.join(runs[0][1])}",
+                  file=sys.stderr)
+
+    report = json.dumps(
+        {
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+            },
+            'results': results
+        },
+        indent=2)
+    if args.output is None:
+        print(report)
+    else:
+        with open(args.output, 'w') as outfile:
+            outfile.write(report)
+
+
+if __name__ == '__main__':
+    main()
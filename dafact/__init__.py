@@ -1,3 +1,16 @@
-from ._main import Dafacter
-
 __version__ = "0.3"
+
+
+def __getattr__(name):
+    # Dafacter and Decoder (and through them numpy) are only imported when they are first used
+    if name == 'Dafacter':
+        from ._main import Dafacter
+        return Dafacter
+    if name == 'Decoder':
+        from .decoders import Decoder
+        return Decoder
+    raise AttributeError(f"module 'dafact' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(list(globals()) + ['Dafacter', 'Decoder'])
@@ -1,17 +1,119 @@
-from dafact import Dafacter
 import argparse
+import glob
+import gzip
+import os
 import sys
 
+# Extensions of the files taken as inputs from a directory.
+INPUT_EXTENSIONS = ('.csv', '.npy', '.npz', '.parquet', '.pq', '.arrow',
+                    '.feather', '.ipc')
+
+
+def open_outfile(path, compress=False):
+    """Opens the output file for writing. '-' stands for the standard output and paths ending in
+    '.gz' (or any path when compress is set) are written gzip-compressed."""
+    if path == '-':
+        return gzip.open(sys.stdout.buffer, 'wt') if compress else sys.stdout
+    if compress or path.endswith('.gz'):
+        return gzip.open(path, 'wt')
+    return open(path, 'w')
+
+
+class LineCounter:
+    def __init__(self, fileobj):
+        """Text file wrapper counting the line breaks written through it. The encoded program of
+        n instances has n line breaks."""
+        self.fileobj = fileobj
+        self.lines = 0
+
+    def write(self, text):
+        self.lines += text.count('\n')
+        return self.fileobj.write(text)
+
+
+def expand_inputs(paths, manifest=None):
+    """Returns the input files given as paths, glob patterns or directories (their csv, NumPy,
+    Parquet and Arrow files, sorted by name), followed by the ones listed in a manifest file (one
+    per line, relative to the manifest)."""
+    paths = list(paths)
+    if manifest is not None:
+        base = os.path.dirname(manifest)
+        with open(manifest) as listing:
+            paths.extend(
+                os.path.join(base, line.strip()) for line in listing
+                if line.strip() and not line.startswith('#'))
+    inputs = []
+    for path in paths:
+        matches = [path] if os.path.exists(path) else sorted(glob.glob(path))
+        if not matches:
+            raise FileNotFoundError(f"No such file: '{path}'")
+        for match in matches:
+            if os.path.isdir(match):
+                inputs.extend(
+                    sorted(
+                        os.path.join(match, name)
+                        for name in os.listdir(match)
+                        if name.lower().endswith(INPUT_EXTENSIONS)))
+            else:
+                inputs.append(match)
+    return inputs
+
+
+def is_input_name(path):
+    """Returns whether a path has the extension of an input file (compressed with gzip or not)."""
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-len('.gz')]
+    return name.endswith(INPUT_EXTENSIONS)
+
+
+def output_path(path, output_dir, compress=False):
+    """Returns the path of the program encoding an input file in output_dir."""
+    name = os.path.splitext(os.path.basename(path))[0] + '.lp'
+    return os.path.join(output_dir, name + '.gz' if compress else name)
+
+
+def encode_file(path, out_path, options, write_options):
+    """Encodes an input file into its own output file. Returns the stats report, if enabled."""
+    from dafact import Dafacter
+    dafacter = Dafacter(path, **options)
+    with open_outfile(out_path) as outfile:
+        dafacter.write_program(outfile, **write_options)
+    return None if dafacter.stats is None else str(dafacter.stats)
+
+
+def print_stats(path, stats, batch):
+    if stats is not None:
+        print(f'{path}:\n{stats}' if batch else stats, file=sys.stderr)
+
+
+def column(value):
+    """Input column given by index or by name."""
+    return int(value) if value.isdigit() else value
+
 
 def main():
     # Handles arguments of xclingo
     parser = argparse.ArgumentParser(
         description='Dafact CLI\n\tEncodes data as ASP facts.')
-    parser.add_argument('infile', type=str, help="Input csv file.")
-    parser.add_argument('outfile',
-                        type=argparse.FileType('w'),
-                        help="Ouput ASP program.")
+    parser.add_argument(
+        'paths',
+        nargs='*',
+        metavar='path',
+        help=
+        "Input csv (or .npy/.npz, Parquet and Arrow IPC) files, directories or glob patterns, followed by the output ASP program (use '-' for the standard output) unless --output-dir is given. Several inputs are concatenated into a single program, numbering their instances consecutively."
+    )
     group = parser.add_argument_group("Options")
+    group.add_argument(
+        '--manifest',
+        type=str,
+        default=None,
+        help="File listing input files, one per line, relative to the manifest.")
+    group.add_argument(
+        '--output-dir',
+        type=str,
+        default=None,
+        help="Writes one program per input file in this directory, named after the input.")
     group.add_argument('--feature-names',
                        nargs='*',
                        default=None,
@@ -36,18 +138,192 @@ def main():
                        type=str,
                        default=',',
                        help="Field delimiter for the csv file.")
+    group.add_argument(
+        '--usecols',
+        nargs='*',
+        type=column,
+        default=None,
+        help="Indexes or names of the only columns to be encoded.")
+    group.add_argument('--engine',
+                       choices=['csv', 'pandas'],
+                       default='csv',
+                       help="Csv parser: numpy with a fallback to Python's csv module, or pandas.")
+    group.add_argument(
+        '--chunksize',
+        type=int,
+        default=None,
+        help="Reads and encodes the csv file in blocks of this many rows.")
+    group.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help=
+        "Number of processes used for encoding (-1 for all the CPUs). With --output-dir and several inputs, files are distributed among the processes."
+    )
+    group.add_argument(
+        '--bins',
+        type=int,
+        default=None,
+        help="Discretizes the numerical columns into this number of bins.")
+    group.add_argument(
+        '--bin-edges',
+        nargs='+',
+        type=float,
+        default=None,
+        help="Cut points used for discretizing the numerical columns.")
+    group.add_argument('--bin-strategy',
+                       choices=['uniform', 'quantile'],
+                       default='uniform',
+                       help="How the edges of --bins are computed.")
+    group.add_argument(
+        '--bin-mode',
+        choices=['replace', 'append'],
+        default='replace',
+        help="Encodes bin ids instead of the values or as extra features.")
+    group.add_argument(
+        '--cache-dir',
+        type=str,
+        default=None,
+        help="Directory where encoded programs are cached for unchanged csv files.")
+    group.add_argument(
+        '--cache-dir-size',
+        type=int,
+        default=2**32,
+        help="Maximum number of bytes taken by the programs in --cache-dir.")
+    group.add_argument(
+        '--cache-by-hash',
+        action='store_true',
+        default=False,
+        help="Identifies files in --cache-dir by the hash of their content instead of by their path, size and modification time.")
+    group.add_argument(
+        '--layout',
+        choices=['default', 'feature_id', 'row', 'predicate'],
+        default='default',
+        help="Layout of the facts: value(i,\"name\",v), value(i,id,v), value(i,v1,...,vn) or name(i,v).")
+    group.add_argument(
+        '--missing',
+        choices=['error', 'skip', 'sentinel', 'fact'],
+        default='error',
+        help="Policy for missing cells: fail, skip their value facts, encode --missing-value or produce missing(i,\"name\") facts.")
+    group.add_argument('--missing-value',
+                       type=int,
+                       default=0,
+                       help="Number encoded for missing cells with --missing sentinel.")
+    group.add_argument(
+        '--deduplicate',
+        action='store_true',
+        default=False,
+        help="Encodes repeated rows once, followed by a count(i,n) fact with their number.")
+    group.add_argument(
+        '--origins',
+        action='store_true',
+        default=False,
+        help="With --deduplicate, adds origin(i,r) facts with the rows each instance stands for (in its input file, so a single input is required unless --output-dir is given).")
+    group.add_argument(
+        '--stats',
+        action='store_true',
+        default=False,
+        help="Prints timings of the encoding phases, rows/s, facts, bytes and peak memory to the standard error.")
+    group.add_argument(
+        '--gzip',
+        action='store_true',
+        default=False,
+        help="Compresses the output with gzip (implied by a '.gz' outfile).")
     args = parser.parse_args()
+    # Imported after parsing the arguments, so --help does not load numpy
+    from dafact import Dafacter
+
+    paths = args.paths
+    if args.output_dir is None:
+        if not paths or (len(paths) < 2 and args.manifest is None):
+            parser.error("an input file and the output ASP program are required.")
+        paths, outfile_path = paths[:-1], paths[-1]
+    try:
+        inputs = expand_inputs(paths, args.manifest)
+    except FileNotFoundError as error:
+        parser.error(str(error))
+    if not inputs:
+        parser.error("no input files found.")
+    if args.output_dir is None:
+        # e.g. the last file of a glob expanded by the shell, which would be overwritten
+        if outfile_path != '-' and (is_input_name(outfile_path) or os.path.abspath(
+                outfile_path) in map(os.path.abspath, inputs)):
+            parser.error(
+                f"refusing to overwrite '{outfile_path}', which looks like an input file: give the output ASP program last (e.g. a .lp file) or use --output-dir."
+            )
+        if args.origins and len(inputs) > 1:
+            parser.error(
+                "--origins refers to the rows of each input, so it needs a single input or --output-dir."
+            )
+
+    options = dict(
+        feature_names=args.feature_names,
+        numerical_columns=args.numerical_columns,
+        have_names=args.have_names,
+        omit_names=args.omit_names,
+        delimiter=args.delimiter,
+        chunksize=args.chunksize,
+        n_jobs=args.jobs,
+        usecols=args.usecols,
+        engine=args.engine,
+        bins=args.bin_edges if args.bin_edges is not None else args.bins,
+        bin_strategy=args.bin_strategy,
+        bin_mode=args.bin_mode,
+        cache_dir=args.cache_dir,
+        cache_dir_size=args.cache_dir_size,
+        cache_by_hash=args.cache_by_hash,
+        stats=args.stats,
+        missing=args.missing,
+        missing_value=args.missing_value,
+        deduplicate=args.deduplicate,
+        origins=args.origins,
+    )
+    write_options = dict(factor=args.factor, layout=args.layout)
+    batch = len(inputs) > 1
+
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+        out_paths = [
+            output_path(path, args.output_dir, args.gzip) for path in inputs
+        ]
+        if len(set(out_paths)) < len(out_paths):
+            parser.error("several inputs have the same name in --output-dir.")
+        n_workers = os.cpu_count() if args.jobs == -1 else args.jobs
+        if batch and n_workers > 1:
+            # Files are encoded in parallel instead of blocks of rows
+            options['n_jobs'] = 1
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(n_workers) as executor:
+                reports = executor.map(encode_file, inputs, out_paths,
+                                       [options] * len(inputs),
+                                       [write_options] * len(inputs))
+                for path, stats in zip(inputs, reports):
+                    print_stats(path, stats, batch)
+        else:
+            for path, out_path in zip(inputs, out_paths):
+                print_stats(path,
+                            encode_file(path, out_path, options, write_options),
+                            batch)
+        return
 
-    # Reads input files
-    args.outfile.write(
-        Dafacter(
-            args.infile,
-            feature_names=args.feature_names,
-            numerical_columns=args.numerical_columns,
-            have_names=args.have_names,
-            omit_names=args.omit_names,
-            delimiter=args.delimiter,
-        ).as_program_string(factor=args.factor))
+    # Writes the program as it is encoded, numbering the instances of each input after the
+    # instances of the previous ones
+    outfile = open_outfile(outfile_path, compress=args.gzip)
+    try:
+        offset = 0
+        for i, path in enumerate(inputs):
+            if i > 0:
+                outfile.write("\n")
+            counter = LineCounter(outfile)
+            dafacter = Dafacter(path, offset=offset, **options)
+            dafacter.write_program(counter, **write_options)
+            offset += counter.lines
+            print_stats(path, dafacter.stats, batch)
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+        else:
+            outfile.flush()
 
 
 if __name__ == "__main__":
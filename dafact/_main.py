@@ -1,6 +1,6 @@
-from dafact.encoders import Encoder, NumpyLikeEncoder, CsvEncoder
-from os import PathLike
-from argparse import FileType
+from dafact.encoders import ArrowEncoder, Encoder, NumpyLikeEncoder, CsvEncoder, SparseEncoder
+from dafact.encoders._encoders import _arrow_format, _load_array
+from os import PathLike, fspath
 
 
 class Dafacter:
@@ -14,34 +14,158 @@ class Dafacter:
                  numerical_columns=None,
                  have_names=False,
                  omit_names=False,
-                 delimiter=","):
+                 delimiter=",",
+                 chunksize=None,
+                 n_jobs=1,
+                 cache_size=2**30,
+                 usecols=None,
+                 engine='csv',
+                 skip_default=True,
+                 bins=None,
+                 bin_strategy='uniform',
+                 bin_mode='replace',
+                 cache_dir=None,
+                 stats=False,
+                 offset=0,
+                 missing='error',
+                 missing_value=0,
+                 deduplicate=False,
+                 origins=False,
+                 cache_dir_size=2**32,
+                 cache_by_hash=False):
         """[summary]
 
         Args:
-            data ([2D array-matrix or str]): data to be encoded in a 2D numpy array-like matrix or the path to a csv file.
+            data ([2D array-matrix or str]): data to be encoded in a 2D numpy array-like matrix, a scipy.sparse matrix or the path to a csv file. Paths to .npy and .npz files (the first array of the latter) are opened as read-only memory maps, so they are not loaded into memory. Paths to Parquet (.parquet, .pq) and Arrow IPC (.arrow, .feather, .ipc) files are read one row group or record batch at a time, which requires pyarrow.
             feature_names ([type], optional): Names of the features/columns. Will overwrite the names retrieved from the csv file in such a case. Defaults to None.
             factor (int, optional): numerical data will be multiplied by 10^factor when encoding. Defaults to 0.
             numerical_columns ([type], optional): indicates which columns store numerical data. Can be specified as a bit-array (zeros when not numerical, any other value otherwise) or as a list of indexes for the numerical columns. Defaults to None.
             have_names (bool, optional): Must be true if the csv file contains the name of the columns in the first line. Defaults to False.
             omit_names (bool, optional): Set to True if user wants to ignore the column names from the file. Defaults to False.
             delimiter (str, optional): Csv delimiter used in the csv file. Defaults to ','.
+            chunksize (int, optional): If given, the csv file is read and encoded in blocks of 'chunksize' rows instead of being loaded at once. Defaults to None.
+            n_jobs (int, optional): Number of processes used for encoding the data as text. -1 means using all the CPUs. Defaults to 1.
+            cache_size (int, optional): Maximum number of bytes taken by the cached encodings. 0 disables the cache. Defaults to 1 GiB.
+            usecols (Iterable[int or str], optional): Indexes (or names, when have_names is True or for Parquet/Arrow files) of the only columns to be read. Defaults to None.
+            engine (str, optional): Csv parser, 'csv' (numpy with a fallback to the csv module) or 'pandas'. Defaults to 'csv'.
+            skip_default (bool, optional): For scipy.sparse data, only the non zero entries are encoded as value facts. Defaults to True.
+            bins (int, Iterable[float] or dict, optional): Discretizes the numerical columns into this number of bins (or using these cut points), encoding bin ids instead of the values. A dict gives the bins of each column, by index or name. Not available for sparse data. Defaults to None.
+            bin_strategy (str, optional): 'uniform' or 'quantile' bins, when their number is given. Defaults to 'uniform'.
+            bin_mode (str, optional): 'replace' encodes bin ids instead of the values, 'append' encodes both (bins as '<name>_bin' features). Defaults to 'replace'.
+            cache_dir (str, optional): Directory where the programs encoded from csv, Parquet or Arrow files are cached, so unchanged files are not encoded again. Defaults to None.
+            stats (bool, optional): If True, timings of every encoding phase, rows/s, facts, bytes and peak memory are recorded in the 'stats' attribute. Defaults to False.
+            offset (int, optional): Index of the first instance, so the instances of several encoded tables do not collide. Defaults to 0.
+            missing (str, optional): Policy for missing cells (nan, None or empty): 'error', 'skip' (no value fact), 'sentinel' (encoded as missing_value) or 'fact' (a missing(i,"name") fact instead of the value). Defaults to 'error'.
+            missing_value (int, optional): Number encoded for missing cells with the 'sentinel' policy. Defaults to 0.
+            deduplicate (bool, optional): If True, rows encoded the same way (after applying factor) are encoded once, as an instance followed by a count(i,n) fact with its number of rows. Not available for sparse data. Defaults to False.
+            origins (bool, optional): If True, deduplicated instances are also followed by origin(i,r) facts with the positions of the rows they stand for. Defaults to False.
+            cache_dir_size (int, optional): Maximum number of bytes taken by the programs in cache_dir. The least recently used ones are deleted first. Defaults to 4 GiB.
+            cache_by_hash (bool, optional): If True, files are identified in cache_dir by the hash of their content instead of by their path, size and modification time. Defaults to False.
         """
-        if not hasattr(data, 'shape') and (isinstance(data, (str, PathLike))):
+        if isinstance(data, (str, PathLike)) and fspath(data).lower().endswith(
+            ('.npy', '.npz')):
+            data = _load_array(data)
+
+        if isinstance(data, (str, PathLike)) and _arrow_format(data) is not None:
+            self._encoder = ArrowEncoder(data,
+                                         feature_names=feature_names,
+                                         factor=factor,
+                                         numerical_columns=numerical_columns,
+                                         usecols=usecols,
+                                         n_jobs=n_jobs,
+                                         cache_size=cache_size,
+                                         bins=bins,
+                                         bin_strategy=bin_strategy,
+                                         bin_mode=bin_mode,
+                                         cache_dir=cache_dir,
+                                         cache_dir_size=cache_dir_size,
+                                         cache_by_hash=cache_by_hash,
+                                         stats=stats,
+                                         offset=offset,
+                                         missing=missing,
+                                         missing_value=missing_value,
+                                         deduplicate=deduplicate,
+                                         origins=origins)
+        elif not hasattr(data, 'shape') and (isinstance(data, (str, PathLike))):
             self._encoder = CsvEncoder(data,
                                        feature_names=feature_names,
                                        factor=factor,
                                        numerical_columns=numerical_columns,
                                        have_names=have_names,
                                        omit_names=omit_names,
-                                       delimiter=delimiter)
+                                       delimiter=delimiter,
+                                       chunksize=chunksize,
+                                       n_jobs=n_jobs,
+                                       cache_size=cache_size,
+                                       usecols=usecols,
+                                       engine=engine,
+                                       bins=bins,
+                                       bin_strategy=bin_strategy,
+                                       bin_mode=bin_mode,
+                                       cache_dir=cache_dir,
+                                       cache_dir_size=cache_dir_size,
+                                       cache_by_hash=cache_by_hash,
+                                       stats=stats,
+                                       offset=offset,
+                                       missing=missing,
+                                       missing_value=missing_value,
+                                       deduplicate=deduplicate,
+                                       origins=origins)
+        elif hasattr(data, 'tocsr'):
+            if bins is not None:
+                raise ValueError("'bins' is not supported for sparse data.")
+            if deduplicate:
+                raise ValueError(
+                    "'deduplicate' is not supported for sparse data.")
+            self._encoder = SparseEncoder(data,
+                                          feature_names=feature_names,
+                                          factor=factor,
+                                          numerical_columns=numerical_columns,
+                                          skip_default=skip_default,
+                                          n_jobs=n_jobs,
+                                          cache_size=cache_size,
+                                          stats=stats,
+                                          offset=offset,
+                                          missing=missing,
+                                          missing_value=missing_value)
         else:
             self._encoder = NumpyLikeEncoder(
                 data,
                 feature_names=feature_names,
                 factor=factor,
                 numerical_columns=numerical_columns,
+                n_jobs=n_jobs,
+                cache_size=cache_size,
+                bins=bins,
+                bin_strategy=bin_strategy,
+                bin_mode=bin_mode,
+                stats=stats,
+                offset=offset,
+                missing=missing,
+                missing_value=missing_value,
+                deduplicate=deduplicate,
+                origins=origins,
             )
-        self.data = self._encoder.data
         self.feature_names = self._encoder.feature_names
         self.as_clingo_facts = self._encoder.as_clingo_facts
         self.as_program_string = self._encoder.as_program_string
+        self.iter_clingo_facts = self._encoder.iter_clingo_facts
+        self.iter_program_lines = self._encoder.iter_program_lines
+        self.write_program = self._encoder.write_program
+        self.add_to_control = self._encoder.add_to_control
+        self.aencode_program = self._encoder.aencode_program
+        self.aencode_facts = self._encoder.aencode_facts
+        self.aiter_program_lines = self._encoder.aiter_program_lines
+        self.aiter_clingo_facts = self._encoder.aiter_clingo_facts
+        self.awrite_program = self._encoder.awrite_program
+        self.clear_cache = self._encoder.clear_cache
+        self.append = self._encoder.append
+
+    @property
+    def data(self):
+        return self._encoder.data
+
+    @property
+    def stats(self):
+        """EncodingStats of the encoder, or None if they are not enabled."""
+        return self._encoder.stats
@@ -0,0 +1 @@
+from ._decoders import Decoder
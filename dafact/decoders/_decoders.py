@@ -0,0 +1,243 @@
+from numpy import arange, asarray, concatenate, empty, float64, full, int64, nan, repeat, searchsorted, unique
+import re
+
+# Layouts understood by the decoder, the same as the encoders'.
+_LAYOUTS = ('default', 'feature_id', 'row', 'predicate')
+
+# A number or a string term, as clingo prints them.
+_TERM = r'(-?\d+|"(?:[^"\\]|\\.)*")'
+
+# Characters which cannot precede the name of a fact, so a predicate is not matched as the end of
+# another one (nor as a classically negated atom). The lookbehind is placed after the name, so
+# patterns start with a literal and the regex engine can search for it quickly.
+_NOT_AFTER = r"[\w'\-]"
+
+# Names of the facts added to deduplicated programs.
+_COUNT_FUNC = 'count'
+
+
+def _unquote(text):
+    """Returns the str value of an ASP string literal, undoing the escaping done by clingo."""
+    return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1),
+                  text[1:-1])
+
+
+def _name(name):
+    """Returns the regex matching the name of a fact and its opening parenthesis, only where the
+    name is not the end of a longer one."""
+    name = re.escape(name) + r'\('
+    return name + f'(?<!{_NOT_AFTER}{name})'
+
+
+def _fact_pattern(name, arity):
+    """Returns the regex matching the facts of a predicate, capturing each of its arguments."""
+    return re.compile(_name(name) + ','.join([_TERM] * arity) + r'\)')
+
+
+def _scale(numbers, factor):
+    """Undoes the factor applied to numerical values by the encoding."""
+    if factor > 0:
+        return numbers / 10**factor
+    if factor < 0:
+        return numbers * 10**-factor
+    return numbers
+
+
+def _terms(terms, factor):
+    """Converts an array of numbers and string literals (as text) into an array of numbers
+    (divided by 10^factor), or of objects when it holds strings. Each distinct string is unquoted
+    once."""
+    if len(terms) == 0:
+        return empty(0, dtype=int64)
+    quoted = terms.astype('U1') == '"'
+    if not quoted.any():
+        return _scale(terms.astype(int64), factor)
+    values = empty(len(terms), dtype=object)
+    values[~quoted] = _scale(terms[~quoted].astype(int64), factor).tolist()
+    distinct, inverse = unique(terms[quoted], return_inverse=True)
+    values[quoted] = asarray([_unquote(v) for v in distinct.tolist()],
+                             dtype=object)[inverse.ravel()]
+    return values
+
+
+class Decoder:
+    def __init__(self,
+                 feature_names=None,
+                 factor: int = 0,
+                 instance_func='instance',
+                 feature_func='feature',
+                 value_func='value',
+                 layout='default',
+                 counts=False):
+        """Turns the facts produced by an encoder (or atoms with the same shape, e.g. from a clingo
+        model) back into a 2D array or a pandas DataFrame, with one row per instance and one
+        column per feature.
+
+        Facts are parsed from text with one regular expression per kind of fact, and their
+        arguments are converted and scattered into a preallocated array with NumPy, so no
+        Python code runs per fact.
+
+        Args:
+            feature_names ([Iterable[str]], optional): names of the columns, in order. If None, they are taken from the feature facts, or from the value facts in the order they first appear (by id in the feature_id and row layouts, named 'f1', 'f2', etc.). Required by the predicate layout unless feature facts are given. Defaults to None.
+            factor ([int], optional): numerical values are divided by 10^factor, undoing the factor of the encoding. Defaults to 0.
+            instance_func (str, optional): name of the facts identifying each instance. Instances without value facts are decoded as rows of missing values. Defaults to 'instance'.
+            feature_func (str, optional): name of the facts identifying each feature. Defaults to 'feature'.
+            value_func (str, optional): name of the facts holding each value. Defaults to 'value'.
+            layout (str, optional): layout of the facts, see Encoder.as_clingo_facts. Defaults to 'default'.
+            counts (bool, optional): if True, each instance is repeated as many times as its count(i,n) fact says, undoing the deduplication of an encoder. Defaults to False.
+        """
+        if layout not in _LAYOUTS:
+            raise ValueError(f"'layout' must be one of {', '.join(_LAYOUTS)}.")
+        if type(factor) != int:
+            raise ValueError("'factor' must be int.")
+        self.feature_names = None if feature_names is None else list(
+            feature_names)
+        self.factor = factor
+        self.instance_func = instance_func
+        self.feature_func = feature_func
+        self.value_func = value_func
+        self.layout = layout
+        self.counts = counts
+
+    def _matches(self, text, name, arity):
+        """Returns the arguments of the facts of a predicate found in text, as an array of strings
+        with one column per argument."""
+        # findall returns strings for a single argument and tuples otherwise
+        return asarray(_fact_pattern(name, arity).findall(text),
+                       dtype=str).reshape(-1, arity)
+
+    def _feature_names(self, text):
+        """Returns the feature names given at creation or, if None, those of the feature facts (by
+        id in the layouts which refer to features by id), or None if there are none."""
+        if self.feature_names is not None:
+            return self.feature_names
+        if self.layout in ('feature_id', 'row'):
+            features = self._matches(text, self.feature_func, 2)
+            if len(features) == 0:
+                return None
+            ids = features[:, 0].astype(int64)
+            names = empty(ids.max() + 1, dtype=object)
+            names[:] = [f'f{j}' for j in range(1, len(names) + 1)]
+            names[ids] = [_unquote(name) for name in features[:, 1].tolist()]
+            return names.tolist()
+        features = self._matches(text, self.feature_func, 1)
+        if len(features) == 0:
+            return None
+        return [_unquote(name) for name in features[:, 0].tolist()]
+
+    def _cells(self, text, feature_names):
+        """Returns the instance, column and value (as text) of every cell found in text, and the
+        names of the columns."""
+        if self.layout == 'row':
+            if feature_names is None:
+                # The arity of the first value fact gives the number of features
+                first = re.search(
+                    _name(self.value_func) + _TERM +
+                    r'((?:,' + _TERM + r')*)\)', text)
+                arity = 0 if first is None else len(
+                    re.findall(_TERM, first.group(2)))
+                feature_names = [f'f{j}' for j in range(1, arity + 1)]
+            n_columns = len(feature_names)
+            facts = self._matches(text, self.value_func, n_columns + 1)
+            instances = repeat(facts[:, 0], n_columns)
+            columns = arange(len(facts) * n_columns) % max(n_columns, 1)
+            return instances, columns, facts[:, 1:].ravel(), feature_names
+
+        if self.layout == 'predicate':
+            if feature_names is None:
+                raise ValueError(
+                    "The 'predicate' layout needs 'feature_names' or feature facts.")
+            # A single pass over the text for all the predicates, capturing their names
+            found = re.compile(f'(?<!{_NOT_AFTER})(' + '|'.join(
+                re.escape(str(fname)) for fname in feature_names) + r')\(' +
+                               _TERM + ',' + _TERM + r'\)').findall(text)
+            facts = asarray(found, dtype=str).reshape(-1, 3)
+            positions = {str(fname): j for j, fname in enumerate(feature_names)}
+            distinct, inverse = unique(facts[:, 0], return_inverse=True)
+            lookup = asarray([positions[name] for name in distinct.tolist()],
+                             dtype=int64)
+            return facts[:, 1], lookup[inverse.ravel()], facts[:, 2], feature_names
+
+        facts = self._matches(text, self.value_func, 3)
+        if self.layout == 'feature_id':
+            columns = facts[:, 1].astype(int64)
+            n_columns = columns.max() + 1 if len(columns) else 0
+            if feature_names is None:
+                feature_names = [f'f{j}' for j in range(1, n_columns + 1)]
+            elif n_columns > len(feature_names):
+                raise ValueError("Value facts refer to unknown feature ids.")
+            return facts[:, 0], columns, facts[:, 2], feature_names
+
+        # Features are referred by name: each distinct name is looked up once
+        distinct, first, inverse = unique(facts[:, 1],
+                                          return_index=True,
+                                          return_inverse=True)
+        names = [_unquote(name) for name in distinct.tolist()]
+        if feature_names is None:
+            feature_names = [names[k] for k in first.argsort().tolist()]
+        positions = {fname: j for j, fname in enumerate(feature_names)}
+        try:
+            lookup = asarray([positions[name] for name in names], dtype=int64)
+        except KeyError as error:
+            raise ValueError(
+                f"Value facts refer to unknown feature {error}.") from None
+        return facts[:, 0], lookup[inverse.ravel()], facts[:, 2], feature_names
+
+    def decode_text(self, text, as_frame=False):
+        """Decodes the facts found in a text, such as an encoded program or the atoms of a model
+        as printed by clingo (e.g. by #show). Anything else in the text is ignored.
+
+        Args:
+            text ([str]): text with the facts.
+            as_frame (bool, optional): if True, a pandas DataFrame is returned, with the feature names as columns and the instance ids as index. pandas must be installed. Defaults to False.
+
+        Returns:
+            [np.ndarray or pandas.DataFrame]: one row per instance, sorted by instance id. Cells without a value fact are nan. The array holds floats (ints when factor is not positive and every cell has a value), or objects when some value is a string.
+        """
+        feature_names = self._feature_names(text)
+        cell_instances, cell_columns, cell_values, feature_names = self._cells(
+            text, feature_names)
+        cell_instances = cell_instances.astype(int64)
+
+        instances = concatenate(
+            (cell_instances,
+             self._matches(text, self.instance_func, 1)[:, 0].astype(int64)))
+        instances = unique(instances)
+        rows = searchsorted(instances, cell_instances)
+
+        values = _terms(cell_values, self.factor)
+        shape = (len(instances), len(feature_names))
+        if values.dtype.kind == 'O':
+            data = full(shape, nan, dtype=object)
+        elif values.dtype.kind == 'i' and len(values) == shape[0] * shape[1]:
+            # Every cell has a value
+            data = empty(shape, dtype=int64)
+        else:
+            data = full(shape, nan, dtype=float64)
+        data[rows, cell_columns] = values
+
+        if self.counts:
+            count_facts = self._matches(text, _COUNT_FUNC, 2).astype(int64)
+            counts = full(len(instances), 1, dtype=int64)
+            counts[searchsorted(instances, count_facts[:, 0])] = count_facts[:, 1]
+            data = repeat(data, counts, axis=0)
+            instances = repeat(instances, counts)
+
+        if as_frame:
+            import pandas
+            return pandas.DataFrame(data, index=instances, columns=feature_names)
+        return data
+
+    def decode_symbols(self, symbols, as_frame=False):
+        """Decodes clingo symbols, such as the facts returned by Encoder.as_clingo_facts or the
+        atoms of a model (model.symbols(shown=True)). They are printed once and parsed as text,
+        which is much faster than visiting their arguments.
+
+        Args:
+            symbols ([Iterable[clingo.Symbol]]): symbols to be decoded. Those not produced by the encoding are ignored.
+            as_frame (bool, optional): see decode_text. Defaults to False.
+
+        Returns:
+            [np.ndarray or pandas.DataFrame]: same as decode_text.
+        """
+        return self.decode_text(" ".join(map(str, symbols)), as_frame=as_frame)
@@ -1 +1,2 @@
-from ._encoders import CsvEncoder, NumpyLikeEncoder, Encoder
\ No newline at end of file
+from ._encoders import ArrowEncoder, CsvEncoder, NumpyLikeEncoder, SparseEncoder, Encoder
+from ._stats import EncodingStats
\ No newline at end of file
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from sys import getsizeof
+
+# Approximate memory taken by a clingo symbol object, measured on first use.
+_symbol_size = None
+
+
+def text_size(text):
+    """Returns the memory taken by an encoded program string."""
+    return getsizeof(text)
+
+
+def facts_size(facts):
+    """Returns an estimation of the memory taken by a list of clingo symbols."""
+    global _symbol_size
+    if _symbol_size is None:
+        from clingo import Number
+        _symbol_size = getsizeof(Number(0))
+    return getsizeof(facts) + len(facts) * _symbol_size
+
+
+def _join(segments):
+    """Joins the segments of an encoding into a new str or list."""
+    if isinstance(segments[0], str):
+        return "".join(segments)
+    joined = []
+    for segment in segments:
+        joined.extend(segment)
+    return joined
+
+
+class EncodingCache:
+    def __init__(self, max_size):
+        """Least recently used cache of encoded outputs, bounded by their size in bytes.
+
+        Args:
+            max_size ([int]): maximum number of bytes held by the cache. Entries larger than this are never stored. 0 disables the cache.
+        """
+        if type(max_size) != int or max_size < 0:
+            raise ValueError("'max_size' must be a non negative int.")
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """Returns the value stored for key (marking it as the most recently used), or None.
+
+        Segments added by extend are joined here into a new value, so values returned before are never modified.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        segments = entry[0]
+        if len(segments) > 1:
+            segments[:] = [_join(segments)]
+        return segments[0]
+
+    def keys(self):
+        """Returns a list with the keys stored, from least to most recently used."""
+        return list(self._entries)
+
+    def put(self, key, value, size):
+        """Stores value for key, evicting the least recently used entries until it fits."""
+        self._store(key, [value], size)
+
+    def extend(self, key, segment, size):
+        """Adds segment (a str or list of the same kind as the value) at the end of the value stored for key, if any.
+
+        Segments are only joined when the value is read, so extending costs the size of the segment and not of the whole value.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            segments, entry_size = entry
+            self._store(key, segments + [segment], entry_size + size)
+
+    def _store(self, key, segments, size):
+        if key in self._entries:
+            self.size -= self._entries.pop(key)[1]
+        if size > self.max_size:
+            return
+        while self.size + size > self.max_size:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+        self._entries[key] = (segments, size)
+        self.size += size
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
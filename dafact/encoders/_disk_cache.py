@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+from hashlib import sha256
+import os
+import re
+import tempfile
+
+# Extension of the files holding cached programs.
+_SUFFIX = '.lp'
+# Names of the files written by the cache: the sha256 of their key. Other files in the directory
+# are never touched.
+_ENTRY = re.compile('[0-9a-f]{64}' + re.escape(_SUFFIX))
+
+
+def file_hash(path, chunk_size=2**20):
+    """Returns the sha256 hex digest of the content of a file."""
+    digest = sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    def __init__(self, path, max_size):
+        """Cache of encoded programs stored as files in a directory, bounded by their total size
+        in bytes. The least recently used programs are deleted first (other files in the directory
+        are left untouched). Files are written under a
+        temporary name and renamed when complete, so several processes can share the directory.
+
+        Args:
+            path ([str]): directory holding the cache. It is created if it does not exist.
+            max_size ([int]): maximum number of bytes taken by the cached programs. Programs larger than this are never kept.
+        """
+        if type(max_size) != int or max_size < 0:
+            raise ValueError("'max_size' must be a non negative int.")
+        self.path = os.fspath(path)
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path,
+                            sha256(repr(key).encode()).hexdigest() + _SUFFIX)
+
+    def get(self, key):
+        """Returns the path of the file holding the program cached under key, or None."""
+        path = self._file(key)
+        try:
+            # Marks the entry as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    @contextmanager
+    def writer(self, key):
+        """Context manager yielding a text file where the program to be cached under key is
+        written. The program is only stored if the block exits without errors."""
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+        try:
+            with open(fd, 'w', newline='') as cachefile:
+                yield cachefile
+            os.replace(tmp_path, self._file(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict(self._file(key))
+
+    def put(self, key, text):
+        """Stores a program under key."""
+        with self.writer(key) as cachefile:
+            cachefile.write(text)
+
+    def _evict(self, newest):
+        """Deletes the least recently used programs until the cache fits in max_size."""
+        entries = []
+        for entry in os.scandir(self.path):
+            if _ENTRY.fullmatch(entry.name):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path != newest, stat.st_mtime_ns,
+                                stat.st_size, entry.path))
+        size = sum(entry[2] for entry in entries)
+        # The newest program goes first if it does not fit alone, then the oldest ones
+        for _, _, entry_size, path in sorted(
+                entries, key=lambda e: (e[0] or e[2] <= self.max_size, e[1])):
+            if size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def clear(self):
+        """Deletes every cached program, leaving the rest of files in the directory."""
+        for entry in os.scandir(self.path):
+            if _ENTRY.fullmatch(entry.name):
+                os.unlink(entry.path)
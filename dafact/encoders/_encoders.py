@@ -1,75 +1,1410 @@
-from clingo import Function, String, Number
+# clingo, asyncio and multiprocessing are imported where they are used, so encoding as text
+# does not import them.
+from ._cache import EncodingCache, facts_size, text_size
+from ._disk_cache import DiskCache, file_hash
+from ._stats import EncodingStats
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from copy import copy
 import csv
-from numpy import asarray, genfromtxt, zeros, ones
+from functools import partial
+from inspect import isawaitable
+from itertools import chain, count, islice
+from numpy import load, memmap
+from numpy.lib import format as npy_format
+from numpy import arange, ascontiguousarray, asarray, column_stack, concatenate, diff, empty, equal, errstate, iinfo, int8, int16, int32, int64, insert, isfinite, isnan, loadtxt, nan, ndarray, repeat, rint, trunc, unique, where, zeros, ones, bincount, cumsum, digitize, linspace, quantile, searchsorted, argsort
+import os
+import re
+import shutil
+import struct
+from time import perf_counter
+import zipfile
+
+# Number of rows formatted at once by the text encoding.
+_BLOCK_SIZE = 10000
+
+# Default memory budget (in bytes) for the encodings cached by each encoder.
+_CACHE_SIZE = 2**30
+
+# Default disk budget (in bytes) for the programs cached in a cache directory.
+_DISK_CACHE_SIZE = 2**32
+
+# Layouts of the encoded facts:
+#  - 'default': feature("name"). instance(i). value(i,"name",v).
+#  - 'feature_id': feature(id,"name"). instance(i). value(i,id,v).
+#  - 'row': feature(id,"name"). instance(i). value(i,v1,...,vn).
+#  - 'predicate': feature("name"). instance(i). name(i,v).
+_LAYOUTS = ('default', 'feature_id', 'row', 'predicate')
+
+# Strategies for computing the edges of the bins of a column.
+_BIN_STRATEGIES = ('uniform', 'quantile')
+
+# Policies for the missing cells (nan, None or empty strings) of the data:
+#  - 'error': raises a ValueError.
+#  - 'skip': no value fact is produced for them.
+#  - 'sentinel': a fixed number is encoded as their value.
+#  - 'fact': a missing(i,"name") fact is produced instead of the value fact.
+_MISSING_POLICIES = ('error', 'skip', 'sentinel', 'fact')
+
+# Name of the facts marking missing cells.
+_MISSING_FUNC = 'missing'
+
+# Names of the facts giving, for deduplicated data, the number of rows equal to each instance
+# and the rows it stands for.
+_COUNT_FUNC = 'count'
+_ORIGIN_FUNC = 'origin'
+
+# Formats of the files read by ArrowEncoder, by extension.
+_ARROW_FORMATS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'ipc',
+    '.feather': 'ipc',
+    '.ipc': 'ipc',
+}
+
+# Prefix of the program parts holding the blocks of facts added to a clingo Control, numbered so
+# every block gets its own part.
+_CONTROL_PART = 'dafact_block_'
+_control_parts = count()
+
+# Names which can be used as ASP predicates, unless they are keywords.
+_IDENTIFIER = re.compile(r"_*[a-z][A-Za-z0-9_']*")
+_KEYWORDS = ('not', )
+
+
+def _resolve_usecols(usecols, header):
+    """Returns the indexes of the columns selected by usecols, which may be given by name when the csv header is known."""
+    if usecols is None:
+        return None
+    indexes = []
+    for column in usecols:
+        if isinstance(column, str):
+            if header is None:
+                raise ValueError(
+                    "Columns in 'usecols' can only be given by name when the csv file has names."
+                )
+            if column not in header:
+                raise ValueError(f"Column '{column}' not found in the csv file.")
+            indexes.append(header.index(column))
+        else:
+            indexes.append(int(column))
+    return indexes
+
+
+def _categorical_column(values):
+    """Returns a column of strings where equal values share the same str object. Missing values
+    (see _missing_mask) become nan."""
+    distinct, inverse = unique(values.astype(str), return_inverse=True)
+    column = distinct.astype(object)[inverse]
+    missing = _missing_mask(values)
+    if missing is not None:
+        column[missing] = nan
+    return column
+
+
+def _typed_column(values):
+    """Returns a contiguous copy of a column. Numerical columns holding only integers are stored
+    with the smallest int type which holds them. Columns of objects are parsed as float (empty
+    cells become nan), unless they hold non numerical strings: then they are kept as a
+    categorical column."""
+    if values.dtype.kind in 'OSU':
+        parsed = empty(len(values))
+        for i, value in enumerate(values.tolist()):
+            try:
+                parsed[i] = float(value)
+            except (TypeError, ValueError):
+                if value is None or not str(value).strip():
+                    parsed[i] = nan
+                else:
+                    return _categorical_column(values)
+        values = parsed
+    if values.dtype.kind in 'iu' or (len(values) and isfinite(values).all()
+                                     and (values == rint(values)).all()):
+        low, high = (values.min(), values.max()) if len(values) else (0, 0)
+        for int_type in (int8, int16, int32, int64):
+            info = iinfo(int_type)
+            if info.min <= low and high <= info.max:
+                return values.astype(int_type)
+    return ascontiguousarray(values)
+
+
+def _float_column(values):
+    """Returns a column of objects or strings as float, with nan in its missing cells (see
+    _missing_mask), or None if it holds non numerical values."""
+    try:
+        return values.astype(float)
+    except (TypeError, ValueError):
+        pass
+    missing = _missing_mask(values)
+    if missing is None:
+        return None
+    column = empty(len(values))
+    column[missing] = nan
+    try:
+        column[~missing] = values[~missing].astype(float)
+    except (TypeError, ValueError):
+        return None
+    return column
+
+
+def _holds_strings(column):
+    """Returns whether a column holds non numerical values."""
+    return column.dtype.kind not in 'biuf' and _float_column(column) is None
+
+
+def _parse_csv(source, delimiter, usecols, n_columns, categorical=None):
+    """Parses csv lines (a list of lines or a file object) into typed columns. Columns marked in
+    categorical are kept as categorical columns even if their cells look numerical, so a column
+    gets the same kind in every chunk of a file."""
+    position = source.tell() if hasattr(source, 'seek') else None
+    try:
+        if categorical is not None and any(categorical):
+            raise ValueError("Categorical columns are not parsed as numbers.")
+        block = loadtxt(source, delimiter=delimiter, usecols=usecols, ndmin=2)
+    except ValueError:
+        # Missing or non numerical cells, parsed column by column
+        if position is not None:
+            source.seek(position)
+        rows = [row for row in csv.reader(source, delimiter=delimiter) if row]
+        if usecols is not None:
+            rows = [[row[i] for i in usecols] for row in rows]
+        if not rows:
+            return [empty(0) for _ in range(n_columns)]
+        if categorical is None:
+            categorical = [False] * n_columns
+        return [
+            _categorical_column(asarray(cells, dtype=object))
+            if cat else _typed_column(asarray(cells, dtype=object))
+            for cells, cat in zip(zip(*rows), categorical)
+        ]
+    return [_typed_column(block[:, j]) for j in range(block.shape[1])]
+
+
+def _frame_columns(frame, usecols, categorical=None):
+    """Returns the typed columns of a pandas DataFrame read with the given usecols. Columns marked
+    in categorical are kept as categorical columns, see _parse_csv."""
+    if usecols is not None:
+        frame = frame[usecols]
+    if categorical is None:
+        categorical = [False] * frame.shape[1]
+    return [
+        _categorical_column(frame[c].to_numpy())
+        if cat else _typed_column(frame[c].to_numpy())
+        for c, cat in zip(frame.columns, categorical)
+    ]
+
+
+def _frame_column(series):
+    """Returns a column of a pandas DataFrame as a 1D array of its own type. Numerical columns
+    keep their dtype (without copies when pandas allows it), while category, string and other
+    non numerical columns become categorical columns of str objects."""
+    dtype = series.dtype
+    if dtype.kind in 'biuf':
+        numpy_dtype = getattr(dtype, 'numpy_dtype', None)
+        if numpy_dtype is None:
+            return series.to_numpy()
+        # Nullable dtypes (Int64, Float64, boolean), whose missing values become nan
+        if series.hasnans:
+            return series.to_numpy(dtype=float, na_value=nan)
+        return series.to_numpy(dtype=numpy_dtype)
+    if dtype.name == 'category':
+        # Each category is converted once, missing values (code -1) take the last one
+        categories = asarray([str(c) for c in series.cat.categories] + [nan],
+                             dtype=object)
+        return categories[series.cat.codes.to_numpy()]
+    if dtype.kind == 'O':
+        return _typed_column(series.to_numpy())
+    return _categorical_column(series.to_numpy())
+
+
+def _arrow_format(path):
+    """Returns the ArrowEncoder format of a file given its extension, or None."""
+    return _ARROW_FORMATS.get(os.path.splitext(os.fspath(path))[1].lower())
+
+
+def _arrow_column(array):
+    """Returns a column of an Arrow table or record batch as a 1D array. Numerical columns
+    without nulls are converted without copies, the rest become float with nan where null.
+    Dictionary, string and other non numerical columns become categorical columns of str objects
+    (nan where null), converting each distinct value once."""
+    import pyarrow
+    from pyarrow import types
+    if isinstance(array, pyarrow.ChunkedArray):
+        array = array.chunk(0) if array.num_chunks == 1 else array.combine_chunks()
+    kind = array.type
+    if types.is_integer(kind) or types.is_floating(kind) or types.is_boolean(
+            kind) or types.is_decimal(kind):
+        if array.null_count or types.is_decimal(kind):
+            array = array.cast(pyarrow.float64())
+        return array.to_numpy(zero_copy_only=False)
+    if not types.is_dictionary(kind):
+        array = array.dictionary_encode()
+    categories = asarray([str(c) for c in array.dictionary.to_pylist()] +
+                         [nan],
+                         dtype=object)
+    return categories[array.indices.fill_null(-1).to_numpy(
+        zero_copy_only=False)]
+
+
+def _split_chunks(chunks, block_size):
+    """Yields the chunks of rows read from a file (lists of columns) as consecutive blocks of up
+    to block_size rows, with the index of their first row."""
+    start = 0
+    for chunk in chunks:
+        n_rows = len(chunk[0]) if chunk else 0
+        for i in range(0, n_rows, block_size):
+            yield start, [column[i:i + block_size] for column in chunk]
+            start += min(block_size, n_rows - i)
+
+
+def _file_key(path, by_hash):
+    """Returns what identifies a file in the disk cache: the hash of its content, or its path,
+    size and modification time."""
+    if by_hash:
+        return file_hash(path)
+    stat = os.stat(path)
+    return (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+
+
+# Encoder used by the current worker process of a parallel encoding.
+_worker_encoder = None
+
+
+def _load_array(path):
+    """Opens a .npy or .npz file (its first array) as a read-only memory map, so the data is
+    read from disk as it is encoded. Compressed .npz arrays cannot be mapped and are loaded."""
+    if not os.fspath(path).lower().endswith('.npz'):
+        return load(path, mmap_mode='r')
+
+    with zipfile.ZipFile(path) as archive:
+        info = archive.infolist()[0]
+    if info.compress_type == zipfile.ZIP_STORED:
+        with open(path, 'rb') as npzfile:
+            # Skips the zip local file header
+            npzfile.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack('<HH', npzfile.read(4))
+            npzfile.seek(name_len + extra_len, os.SEEK_CUR)
+            version = npy_format.read_magic(npzfile)
+            if version == (1, 0):
+                header = npy_format.read_array_header_1_0(npzfile)
+            else:
+                header = npy_format.read_array_header_2_0(npzfile)
+            shape, fortran_order, dtype = header
+            offset = npzfile.tell()
+        if not dtype.hasobject:
+            return memmap(path,
+                          dtype=dtype,
+                          mode='r',
+                          shape=shape,
+                          order='F' if fortran_order else 'C',
+                          offset=offset)
+    with load(path) as npzfile:
+        return npzfile[npzfile.files[0]]
+
+
+def _quote(value):
+    """Returns value as an ASP string literal, escaped the same way clingo prints String symbols."""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n') + '"'
+
+
+def _escape_format(text):
+    """Escapes text so it can be safely embedded into a %-format template."""
+    return text.replace('%', '%%')
+
+
+def _instance_template(instance_func):
+    """Returns the %-format template of an instance fact, taking its index."""
+    return _escape_format(instance_func) + '(%d).'
+
+
+def _value_templates(feature_names, value_func, categorical, layout='default'):
+    """Returns the %-format template of the value fact of each feature, taking the instance
+    index and the value (already quoted for categorical features). Not used by the row layout."""
+    templates = []
+    for j, (fname, cat) in enumerate(zip(feature_names, categorical)):
+        if layout == 'predicate':
+            head = _escape_format(f'{fname}(') + '%d'
+        elif layout == 'feature_id':
+            head = _escape_format(f'{value_func}(') + f'%d,{j}'
+        else:
+            head = _escape_format(f'{value_func}(') + '%d,' + _escape_format(
+                _quote(fname))
+        templates.append(' ' + head + (',%s).' if cat else ',%d).'))
+    return templates
+
+
+def _missing_templates(feature_names, layout):
+    """Returns the %-format template of the missing fact of each feature, taking the instance
+    index and the feature as given by _missing_features."""
+    cell = '%d' if layout == 'feature_id' else '%s'
+    return [f' {_MISSING_FUNC}(%d,{cell}).'] * len(feature_names)
+
+
+def _missing_features(feature_names, layout):
+    """Returns how missing facts refer to each feature: its id in the feature_id layout, its
+    quoted name otherwise."""
+    if layout == 'feature_id':
+        return arange(len(feature_names), dtype=int64)
+    return asarray([_quote(fname) for fname in feature_names], dtype=object)
+
+
+def _missing_mask(column):
+    """Returns a bool array marking the missing cells of a column (nan, None or empty strings),
+    or None if it has none."""
+    kind = column.dtype.kind
+    if kind in 'fc':
+        mask = isnan(column)
+    elif kind == 'O':
+        mask = (column != column) | equal(column, None) | (column == '')
+    elif kind in 'US':
+        mask = column == column.dtype.type()
+    else:
+        return None
+    return mask if mask.any() else None
+
+
+def _non_ints(values):
+    """Returns a bool array marking the floats which cannot be cast to int64: nan, infinities and
+    numbers out of its range."""
+    with errstate(invalid='ignore'):
+        return ~(abs(values) < 2.0**63)
+
+
+def _column_bins(column_bins):
+    """Returns the number of bins (an int) or the sorted cut points (a float array) of a column."""
+    if isinstance(column_bins, int):
+        if column_bins < 1:
+            raise ValueError("The number of bins must be a positive int.")
+        return column_bins
+    return asarray(sorted(column_bins), dtype=float)
+
+
+def _check_layout(layout, feature_names, missing='error'):
+    """Raises a ValueError if the layout is unknown or cannot encode the given feature names
+    with the given missing values policy."""
+    if layout not in _LAYOUTS:
+        raise ValueError(f"'layout' must be one of {', '.join(_LAYOUTS)}.")
+    if layout == 'row' and missing in ('skip', 'fact'):
+        raise ValueError(
+            "The 'row' layout needs a value for every cell: use the 'error' or 'sentinel' missing values policy."
+        )
+    if layout == 'predicate':
+        for fname in feature_names:
+            if not _IDENTIFIER.fullmatch(
+                    str(fname)) or str(fname) in _KEYWORDS:
+                raise ValueError(
+                    f"Feature name '{fname}' is not a valid ASP predicate name, which is required by the 'predicate' layout."
+                )
+
+
+def _feature_line(feature_names, feature_func, layout):
+    """Returns the line of feature facts of the text encoding."""
+    if layout in ('feature_id', 'row'):
+        return " ".join(f'{feature_func}({j},{_quote(fname)}).'
+                        for j, fname in enumerate(feature_names))
+    return " ".join(f'{feature_func}({_quote(fname)}).'
+                    for fname in feature_names)
+
+
+def _format_rows(start,
+                 indptr,
+                 cell_columns,
+                 cell_values,
+                 row_template,
+                 cell_templates,
+                 row_values=None):
+    """Formats rows with a variable number of cells (in CSR layout: the cells of row r are
+    cell_columns[indptr[r]:indptr[r + 1]]) with a single %-format operation, the same way
+    Encoder._text_block formats full rows.
+
+    Args:
+        start ([int]): index of the first row.
+        indptr ([np.ndarray]): CSR row pointers.
+        cell_columns ([np.ndarray]): column of every cell.
+        cell_values ([np.ndarray]): value of every cell, as int or as quoted strings.
+        row_template ([str]): template of the fact starting a row, taking the row index (and its value from row_values, if given).
+        cell_templates ([List[str]]): template of the fact of each column, taking the row index and the value.
+        row_values ([np.ndarray], optional): int value of every row, taken by row_template after the row index. Defaults to None.
+    """
+    n_rows = len(indptr) - 1
+    n_cells = len(cell_columns)
+    if n_rows == 0:
+        return ''
+    width = 1 if row_values is None else 2
+    row_starts = arange(n_rows) + indptr[:-1]
+    cell_rows = repeat(arange(n_rows), diff(indptr))
+    cells = arange(n_cells)
+
+    pieces = empty(n_rows + n_cells, dtype=object)
+    pieces[row_starts] = '\n' + row_template
+    pieces[cell_rows + 1 + cells] = asarray(cell_templates,
+                                            dtype=object)[cell_columns]
+
+    index = arange(start, start + n_rows, dtype=int64)
+    args = empty(width * n_rows + 2 * n_cells,
+                 dtype=object if cell_values.dtype.kind == 'O' else int64)
+    row_args = width * arange(n_rows) + 2 * indptr[:-1]
+    args[row_args] = index
+    if row_values is not None:
+        args[row_args + 1] = row_values
+    cell_args = width * (cell_rows + 1) + 2 * cells
+    args[cell_args] = index[cell_rows]
+    args[cell_args + 1] = cell_values
+    return ("".join(pieces.tolist()) % tuple(args.tolist()))[1:]
+
+
+def _row_facts_text(start, counts, origins):
+    """Returns the count facts (followed by the origin facts, if given) of the rows of a block of
+    deduplicated data, one line per row."""
+    if origins is None:
+        indptr, rows = zeros(len(counts) + 1, dtype=int64), empty(0, dtype=int64)
+    else:
+        indptr, rows = origins
+    return _format_rows(start,
+                        indptr,
+                        zeros(len(rows), dtype=int64),
+                        rows,
+                        f' {_COUNT_FUNC}(%d,%d).', [f' {_ORIGIN_FUNC}(%d,%d).'],
+                        row_values=counts)
+
+
+def _block_rows(columns):
+    """Returns the number of rows of a block (a list of columns or a sparse matrix)."""
+    if isinstance(columns, list):
+        return len(columns[0]) if columns else 0
+    return columns.shape[0]
+
+
+def _next_batch(iterator, size):
+    return list(islice(iterator, size))
+
+
+def _check_executor(executor):
+    """Raises a ValueError if the executor runs its tasks in other processes, where the state of
+    the encoder (and the iterators over it) is not available."""
+    from concurrent.futures import ProcessPoolExecutor
+    if isinstance(executor, ProcessPoolExecutor):
+        raise ValueError(
+            "'executor' must be a thread executor. Use 'n_jobs' for encoding in several processes."
+        )
+
+
+async def _abatches(iterator, executor, size=_BLOCK_SIZE):
+    """Yields the items of a blocking iterator in lists of up to size items. Each list is taken
+    from the iterator in the executor (the default thread pool if None), so the event loop keeps
+    running while the data is encoded. The iterator cannot leave the process, so the executor
+    must run its tasks in threads."""
+    import asyncio
+    _check_executor(executor)
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = await loop.run_in_executor(executor, _next_batch, iterator,
+                                           size)
+        if not batch:
+            return
+        yield batch
+
+
+def _init_worker(encoder, shm_name, shape, dtype):
+    """Initializes a worker process of a parallel encoding. When shm_name is given, the data of
+    the encoder is attached from that shared memory block instead of being pickled."""
+    global _worker_encoder
+    if shm_name is not None:
+        # The parent process owns the block and unlinks it when done
+        from multiprocessing.shared_memory import SharedMemory
+        shm = SharedMemory(name=shm_name)
+        encoder.data = ndarray(shape, dtype=dtype, buffer=shm.buf)
+        encoder._shm = shm
+    _worker_encoder = encoder
+
+
+def _text_block_task(start, stop, columns, args):
+    """Encodes a block of rows as text in a worker process, returning the text and its number of
+    facts. The rows are taken from the shared data when columns is None."""
+    if columns is None:
+        block = _worker_encoder.data[start:stop]
+        columns = [block[:, j] for j in range(block.shape[1])]
+        start += _worker_encoder.offset
+    return _worker_encoder._text_block(start, columns, *args)
 
 
 class Encoder:
+    _data = None
+    _columns = None
+    _categorical = None
+    _source_rows = None
+    _disk_cache = None
+
     def __init__(self,
                  data,
                  feature_names=None,
                  numerical_columns=None,
-                 factor: int = 0):
+                 factor: int = 0,
+                 n_jobs: int = 1,
+                 cache_size: int = _CACHE_SIZE,
+                 bins=None,
+                 bin_strategy='uniform',
+                 bin_mode='replace',
+                 stats=False,
+                 offset: int = 0,
+                 missing='error',
+                 missing_value: int = 0,
+                 deduplicate=False,
+                 origins=False):
         """WARNING: this class is not intended to be instanciated. Use a child class instead.
 
         Args:
             data ([np.ndarray]): should be 2-dimensional.
             feature_names ([Iterable[str]], optional): name of the columns. If None, default names (f1, f2, etc.) will be given: Defaults to None.
-            numerical_columns (Iterable[int], optional): indexes of the columns which are meant to be treated as numerical. If None, all columns will be treated as numerical. Can be given as a bit array (zero for non numerical columns, anything otherwise) or as a list of indexes. Defaults to None.
+            numerical_columns (Iterable[int], optional): indexes of the columns which are meant to be treated as numerical. If None, all columns will be treated as numerical, except those holding non numerical strings, which are categorical. Columns given as numerical must hold numbers. Can be given as a bit array (zero for non numerical columns, anything otherwise) or as a list of indexes. Defaults to None.
             factor ([int], optinal): if not None, numerical data will be multiplyed by 10^factor and then rounded. Defaults to None.
+            n_jobs ([int], optional): number of processes used for encoding the data as text. Blocks of rows are encoded in parallel and concatenated in order. NumPy data is shared with the workers through shared memory. -1 means using all the CPUs. Defaults to 1.
+            cache_size ([int], optional): maximum number of bytes taken by the cached encodings. The least recently used encodings are discarded first. 0 disables the cache. Defaults to 1 GiB.
+            bins ([int, Iterable[float] or dict], optional): discretizes columns, encoding the id of the bin (0, 1, etc.) of each value instead of the value itself. An int gives the number of bins and a list of floats gives the cut points (in the units of the data, before applying factor) used for every numerical column (categorical columns are skipped). A dict maps columns (by index or name) to their own number of bins or cut points. None disables binning. Defaults to None.
+            bin_strategy ([str], optional): how the edges of the bins are computed when their number is given: 'uniform' (bins of equal width between the min and max of the column) or 'quantile' (bins with the same number of values). Edges are computed over the data the first time it is encoded. Defaults to 'uniform'.
+            bin_mode ([str], optional): 'replace' encodes the bin ids instead of the values of the binned columns. 'append' encodes both, the bin ids as extra features named '<name>_bin' after the rest. Defaults to 'replace'.
+            stats ([bool], optional): if True, timings of every encoding phase, rows, facts and bytes produced are recorded in the 'stats' attribute (an EncodingStats object). Otherwise 'stats' is None. Defaults to False.
+            offset ([int], optional): index of the first instance, so the instances of several encoded tables do not collide. Defaults to 0.
+            missing ([str], optional): policy for missing cells (nan, None or empty strings). 'error' raises a ValueError naming the column and instance. 'skip' produces no value fact for them. 'sentinel' encodes missing_value as their value. 'fact' produces a missing(i,"name") fact (missing(i,id) in the feature_id layout) instead of their value fact. Missing cells are found with one mask per column and block of rows, so blocks without them are encoded as usual. The 'row' layout only supports 'error' and 'sentinel'. Defaults to 'error'.
+            missing_value ([int], optional): number encoded for missing cells with the 'sentinel' policy, in every column and without applying factor. Defaults to 0.
+            deduplicate ([bool], optional): if True, rows whose encoded values are equal (after applying factor and bins) are encoded once, as a single instance followed by a count(i,n) fact with the number n of rows it stands for. Instances are numbered consecutively (from offset) in the order the distinct rows first appear. Each encoding takes an extra pass over the data, and memory grows with the number of distinct rows. Text encodings are formatted in a single process. Defaults to False.
+            origins ([bool], optional): if True, deduplicated instances are also followed by an origin(i,r) fact for each row r (its position in the data, from 0) they stand for. Defaults to False.
 
         Raises:
             ValueError: if feature_names length does not match the shape of data.
         """
+        self.data = data
+        n_columns = self._n_columns()
+
         if feature_names is None:
-            feature_names = [f'f{i}' for i in range(1, data.shape[1] + 1)]
-        elif len(feature_names) != data.shape[1]:
+            feature_names = [f'f{i}' for i in range(1, n_columns + 1)]
+        elif len(feature_names) != n_columns:
             raise ValueError("'feature_names' len does not match data shape.")
 
+        # Columns given as numerical are never categorical
+        self._given_numerical = numerical_columns is not None
         if numerical_columns is None:
-            self._numerical_columns = ones((data.shape[1]))
+            self._numerical_columns = ones((n_columns))
         else:
-            if len(numerical_columns) == data.shape[1]:
+            if len(numerical_columns) == n_columns:
                 self._numerical_columns = numerical_columns
             else:
-                self._numerical_columns = zeros((data.shape[1], ))
+                self._numerical_columns = zeros((n_columns, ))
                 for i in numerical_columns:
                     self._numerical_columns[i] = 1
 
         if type(factor) != int:
             raise ValueError("'factor' must be int.")
 
-        self.data = data
+        if type(n_jobs) != int or n_jobs == 0 or n_jobs < -1:
+            raise ValueError("'n_jobs' must be a positive int or -1.")
+
+        if type(offset) != int:
+            raise ValueError("'offset' must be int.")
+
+        if missing not in _MISSING_POLICIES:
+            raise ValueError(
+                f"'missing' must be one of {', '.join(_MISSING_POLICIES)}.")
+        if type(missing_value) != int:
+            raise ValueError("'missing_value' must be int.")
+
         self.feature_names = feature_names
         self.factor = factor
+        self.offset = offset
+        self.missing = missing
+        self.missing_value = missing_value
+        self.deduplicate = deduplicate
+        self.origins = origins
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+
+        if bin_strategy not in _BIN_STRATEGIES:
+            raise ValueError("'bin_strategy' must be 'uniform' or 'quantile'.")
+        if bin_mode not in ('replace', 'append'):
+            raise ValueError("'bin_mode' must be 'replace' or 'append'.")
+        self.bin_strategy = bin_strategy
+        self.bin_mode = bin_mode
+        if bins is None or isinstance(bins, dict):
+            self._resolved_bins = self._resolve_bins(bins)
+        else:
+            # Resolved when first needed, as the categorical columns are skipped
+            self._resolved_bins = None
+            bins = _column_bins(bins)
+        self._given_bins = bins
+        self._bin_edges = None
 
-        self._facts_cache = None
-        self._text_cache = None
-        self._last_call = (None, None, None, None, None)
+        self._cache = EncodingCache(cache_size)
+        self.stats = EncodingStats() if stats else None
+        # Blocks of columns added through append()
+        self._appended = []
+        self._n_appended = 0
+
+    def _cache_key(self, kind, feature_names, factor, instance_func,
+                   feature_func, value_func, layout):
+        return (kind, tuple(feature_names), factor, instance_func,
+                feature_func, value_func, layout)
+
+    def clear_cache(self):
+        """Discards every cached encoding held in memory."""
+        self._cache.clear()
+
+    def _phase(self, name):
+        """Returns a context manager recording the time spent in a phase, if stats are enabled."""
+        if self.stats is None:
+            return nullcontext()
+        return self.stats.phase(name)
+
+    def _cache_hit(self):
+        if self.stats is not None:
+            self.stats.cache_hits += 1
+
+    def _source_key(self):
+        """Returns what identifies the data source in the disk cache."""
+        return None
+
+    def _disk_key(self, key):
+        """Returns the key of an encoding in the disk cache, or None when it is not cached on disk.
+        Data with appended rows is never cached on disk."""
+        if self._disk_cache is None or self._appended:
+            return None
+        from dafact import __version__
+        bins = self._given_bins
+        if isinstance(bins, dict):
+            bins = {
+                j: column_bins if isinstance(column_bins, int) else
+                column_bins.tolist()
+                for j, column_bins in self._bins.items()
+            }
+        elif bins is not None and not isinstance(bins, int):
+            bins = bins.tolist()
+        return (__version__, type(self).__name__, self._source_key(), key,
+                self.offset,
+                [bool(numerical) for numerical in self._numerical_columns],
+                bins, self.bin_strategy, self.bin_mode, self.missing,
+                self.missing_value, self.deduplicate, self.origins)
+
+    def _disk_path(self, key):
+        """Returns the path of the file holding an encoding in the disk cache, or None."""
+        disk_key = self._disk_key(key)
+        if disk_key is None:
+            return None
+        return self._disk_cache.get(disk_key)
+
+    @property
+    def data(self):
+        """2D array with the data being encoded. Encoders which store their data as typed columns
+        or which had rows appended build it on each access."""
+        if self._columns is not None:
+            data = column_stack(self._columns)
+        else:
+            data = self._data
+        if data is not None and self._appended:
+            data = concatenate([data] + [
+                column_stack(columns) for columns in self._appended
+            ])
+        return data
 
-    def _check_facts_cache(self, feature_names, factor, instance_func,
-                           feature_func, value_func):
-        return (self._facts_cache is not None) \
-            and self._last_call == (feature_names, factor, instance_func, feature_func, value_func)
+    @data.setter
+    def data(self, data):
+        self._data = data
 
-    def _check_text_cache(self, feature_names, factor, instance_func,
-                          feature_func, value_func):
-        return (self._text_cache is not None) \
-            and self._last_call == (feature_names, factor, instance_func, feature_func, value_func)
+    def _n_columns(self):
+        if self._columns is not None:
+            return len(self._columns)
+        return self._data.shape[1]
 
     def _get_feature_names(self, feature_names):
+        """Returns the names of the encoded features: the given ones (or the default ones) followed
+        by the names of the bin features in the 'append' bin mode."""
         if feature_names is None:
-            return self.feature_names
-        elif len(feature_names) != self.data.shape[1]:
+            feature_names = self.feature_names
+        elif len(feature_names) != self._n_columns():
             raise ValueError("'feature_names' len does not match data shape.")
+        if self._bins and self.bin_mode == 'append':
+            feature_names = list(feature_names) + [
+                f'{feature_names[j]}_bin' for j in self._bins
+            ]
+        return feature_names
+
+    @property
+    def _bins(self):
+        """Number of bins or cut points of each binned column, by column index."""
+        if self._resolved_bins is None:
+            self._resolved_bins = self._resolve_bins(self._given_bins)
+        return self._resolved_bins
+
+    def _resolve_bins(self, bins):
+        """Returns the number of bins or the cut points of each binned column, by column index. Bins
+        given for every column only apply to the numerical ones which are not categorical."""
+        if bins is None:
+            return {}
+        if not isinstance(bins, dict):
+            return {
+                j: bins
+                for j, (numerical, cat) in enumerate(
+                    zip(self._numerical_columns, self.categorical_columns))
+                if numerical and not cat
+            }
+        resolved = {}
+        for column, column_bins in bins.items():
+            if isinstance(column, str):
+                if column not in self.feature_names:
+                    raise ValueError(f"Column '{column}' not found in 'bins'.")
+                column = list(self.feature_names).index(column)
+            elif not 0 <= column < self._n_columns():
+                raise ValueError(f"Column {column} out of range in 'bins'.")
+            resolved[column] = _column_bins(column_bins)
+        return dict(sorted(resolved.items()))
+
+    @property
+    def bin_edges(self):
+        """Inner edges of the bins of each binned column, by column index. A value v falls in bin
+        b when edges[b - 1] <= v < edges[b]. Edges given by their number are computed over the
+        data the first time they are needed and kept afterwards, so appended rows are binned the
+        same way."""
+        if self._bin_edges is None:
+            self._bin_edges = self._compute_bin_edges()
+        return self._bin_edges
+
+    def _compute_bin_edges(self):
+        edges = {
+            j: column_bins
+            for j, column_bins in self._bins.items()
+            if not isinstance(column_bins, int)
+        }
+        pending = [j for j in self._bins if j not in edges]
+        if not pending:
+            return edges
+        values = {j: [] for j in pending}
+        for _, columns in self._iter_blocks():
+            for j in pending:
+                values[j].append(self._bin_values(columns[j], j))
+        for j in pending:
+            column = concatenate(values[j]) if values[j] else empty(0)
+            column = column[isfinite(column)]
+            n_bins = self._bins[j]
+            if len(column) == 0:
+                edges[j] = empty(0)
+            elif self.bin_strategy == 'uniform':
+                edges[j] = linspace(column.min(), column.max(),
+                                    n_bins + 1)[1:-1]
+            else:
+                edges[j] = unique(
+                    quantile(column, linspace(0, 1, n_bins + 1)[1:-1]))
+        return dict(sorted(edges.items()))
+
+    def _bin_values(self, column, j):
+        """Returns the values of a binned column as float."""
+        try:
+            return column.astype(float)
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"Column '{self.feature_names[j]}' cannot be binned: it is not numerical."
+            ) from None
+
+    def _iter_blocks(self, block_size=_BLOCK_SIZE):
+        """Yields the data as consecutive blocks of rows, including the appended ones.
+
+        Yields:
+            [Tuple[int, List[np.ndarray]]]: index of the first instance of the block (counting from offset) and one 1D array per column.
+        """
+        for start, columns in self._iter_source_blocks(block_size):
+            yield start + self.offset, columns
+        yield from self._iter_appended_blocks()
+
+    def _iter_appended_blocks(self):
+        start = self._n_source_rows() + self.offset
+        for columns in self._appended:
+            yield start, columns
+            start += len(columns[0]) if columns else 0
+
+    def _n_source_rows(self):
+        """Returns the number of rows of the data source (appended rows excluded)."""
+        if self._source_rows is None:
+            self._source_rows = sum(
+                len(columns[0]) if columns else 0
+                for _, columns in self._iter_source_blocks())
+        return self._source_rows
+
+    def _iter_source_blocks(self, block_size=_BLOCK_SIZE):
+        """Yields the data given at creation as consecutive blocks of rows."""
+        if self._columns is not None:
+            n_rows = len(self._columns[0]) if self._columns else 0
+            for start in range(0, n_rows, block_size):
+                yield start, [
+                    column[start:start + block_size]
+                    for column in self._columns
+                ]
+            return
+
+        n_rows = self._data.shape[0]
+        for start in range(0, n_rows, block_size):
+            block = self._data[start:start + block_size]
+            yield start, [block[:, j] for j in range(block.shape[1])]
+
+    @property
+    def categorical_columns(self):
+        """Whether each column is categorical: it holds non numerical strings and its values are
+        encoded as strings. Kinds are decided once, over the whole data (appended rows included),
+        the first time they are needed and kept afterwards, so every block of rows and every
+        chunk of a file is encoded the same way."""
+        if self._categorical is None:
+            self._categorical = self._find_categorical()
+        return self._categorical
+
+    def _find_categorical(self):
+        """Returns whether each column is categorical, taking a pass over the data. Columns with a
+        numerical dtype are not looked at."""
+        n_columns = self._n_columns()
+        categorical = [False] * n_columns
+        pending = [
+            j for j in range(n_columns)
+            if not (self._given_numerical and self._numerical_columns[j])
+        ]
+        for _, columns in self._iter_blocks():
+            for j in pending:
+                if not categorical[j] and _holds_strings(columns[j]):
+                    categorical[j] = True
+            pending = [j for j in pending if not categorical[j]]
+            if not pending:
+                break
+        return categorical
+
+    def _value_columns(self, start, columns, factor):
+        """Returns the values to be encoded for each column of a block.
+
+        Numerical columns are multiplied by 10^factor and then rounded, the rest are truncated to
+        int (both as int64 arrays). Categorical columns (see categorical_columns) are returned as
+        str arrays. Binned columns are returned as their bin ids, replacing the values or after
+        the rest of columns depending on the bin mode.
+
+        Raises:
+            ValueError: if a value cannot be encoded as an int (non numerical strings in a column which is not categorical, infinities and numbers out of the int64 range). Missing cells (nan) are left to the missing values policy.
+        """
+        mult = 10**factor
+        values = []
+        for j, (numerical, cat, column) in enumerate(
+                zip(self._numerical_columns, self.categorical_columns,
+                    columns)):
+            if cat:
+                values.append(column.astype(str))
+                continue
+            if column.dtype.kind not in 'biuf':
+                parsed = _float_column(column)
+                if parsed is None:
+                    raise ValueError(
+                        f"Column '{self.feature_names[j]}' is numerical but holds non numerical values."
+                    )
+                column = parsed
+            if column.dtype.kind in 'biu' and (factor >= 0 or not numerical):
+                values.append(
+                    column.astype(int64) * (mult if numerical else 1))
+                continue
+            with errstate(invalid='ignore'):
+                column = rint(column * mult) if numerical else trunc(column)
+            invalid = _non_ints(column)
+            if invalid.any():
+                invalid &= ~isnan(column)
+                if invalid.any() and not (j in self._bins
+                                          and self.bin_mode == 'replace'):
+                    r = int(invalid.argmax())
+                    raise ValueError(
+                        f"Value {column[r]} in column '{self.feature_names[j]}' of instance {start + r} cannot be encoded as an int."
+                    )
+            # Missing cells are cast to arbitrary ints, see _missing_cells
+            with errstate(invalid='ignore'):
+                values.append(column.astype(int64))
+        if self._bins:
+            bin_ids = [
+                digitize(self._bin_values(columns[j], j), edges).astype(int64)
+                for j, edges in self.bin_edges.items()
+            ]
+            if self.bin_mode == 'append':
+                values.extend(bin_ids)
+            else:
+                for j, column in zip(self._bins, bin_ids):
+                    values[j] = column
+        return values
+
+    def _missing_cells(self, start, columns):
+        """Returns a 2D bool array marking the missing cells of a block of rows, with one column per
+        encoded value (bin features included), or None if no cell is missing. Raises a ValueError
+        under the 'error' policy."""
+        masks = [_missing_mask(column) for column in columns]
+        if all(mask is None for mask in masks):
+            return None
+        if self.missing == 'error':
+            # The first missing cell in row order
+            r, j = min((int(mask.argmax()), j) for j, mask in enumerate(masks)
+                       if mask is not None)
+            raise ValueError(
+                f"Missing value in column '{self.feature_names[j]}' of instance {start + r}. Use 'missing' to skip, replace or mark missing values."
+            )
+        if self._bins and self.bin_mode == 'append':
+            masks += [masks[j] for j in self._bins]
+        missing = zeros((len(columns[0]), len(masks)), dtype=bool)
+        for j, mask in enumerate(masks):
+            if mask is not None:
+                missing[:, j] = mask
+        return missing
+
+    def _row_keys(self, start, columns, factor, codes):
+        """Returns the encoded values of each row of a block as fixed-size byte strings (a 1D void
+        array), so rows encoded the same way have equal keys. Categorical values are replaced by
+        int codes, kept in codes for the whole encoding. Missing cells are flagged in extra columns."""
+        # Raises under the 'error' policy, with the position of the row in the data
+        missing = self._missing_cells(start, columns)
+        values = self._value_columns(start, columns, factor)
+        n_values = len(values)
+        width = n_values if self.missing == 'error' else 2 * n_values
+        keys = empty((len(columns[0]), width), dtype=int64)
+        for j, column in enumerate(values):
+            if column.dtype.kind == 'U':
+                distinct, inverse = unique(column, return_inverse=True)
+                column = asarray(
+                    [codes.setdefault(v, len(codes)) for v in distinct.tolist()],
+                    dtype=int64)[inverse]
+            keys[:, j] = column
+        if self.missing != 'error':
+            if missing is None:
+                keys[:, n_values:] = 0
+            else:
+                keys[:, :n_values][missing] = 0
+                keys[:, n_values:] = missing
+        return keys.view(f'V{8 * width}').ravel()
+
+    def _iter_distinct_blocks(self, factor, block_size=_BLOCK_SIZE):
+        """Yields the distinct rows of the data (the first of each group of rows encoded the same
+        way) as consecutive blocks.
+
+        Rows are matched block by block: the keys of a block are made unique with np.unique and
+        looked up among the keys seen so far with a binary search, so only the distinct rows are
+        kept in memory (plus the id of every row when origins are encoded).
+
+        Yields:
+            [Tuple[int, List[np.ndarray], np.ndarray, Tuple[np.ndarray, np.ndarray]]]: index of the first instance of the block, one 1D array per column, the number of rows equal to each one and, if origins are encoded, the positions of those rows in CSR layout (None otherwise).
+        """
+        codes = {}
+        seen, seen_ids = None, empty(0, dtype=int64)
+        counts = empty(0, dtype=int64)
+        distinct_rows, row_ids = [], []
+        for start, columns in self._iter_timed_blocks():
+            if _block_rows(columns) == 0:
+                continue
+            with self._phase('deduplicate'):
+                keys = self._row_keys(start, columns, factor, codes)
+                if seen is None:
+                    seen = keys[:0]
+                distinct, first, inverse, block_counts = unique(
+                    keys,
+                    return_index=True,
+                    return_inverse=True,
+                    return_counts=True)
+                positions = searchsorted(seen, distinct)
+                found = positions < len(seen)
+                found[found] = seen[positions[found]] == distinct[found]
+                ids = empty(len(distinct), dtype=int64)
+                ids[found] = seen_ids[positions[found]]
+                # New rows are numbered in the order they appear
+                new = (~found).nonzero()[0]
+                new = new[argsort(first[new], kind='stable')]
+                ids[new] = len(counts) + arange(len(new))
+                counts = concatenate((counts, zeros(len(new), dtype=int64)))
+                counts[ids] += block_counts
+                distinct_rows.append(
+                    [column[first[new]] for column in columns])
+                seen = insert(seen, positions[~found], distinct[~found])
+                seen_ids = insert(seen_ids, positions[~found], ids[~found])
+                if self.origins:
+                    row_ids.append(ids[inverse.ravel()])
+        if not distinct_rows:
+            return
+
+        with self._phase('deduplicate'):
+            columns = [
+                concatenate([rows[j] for rows in distinct_rows])
+                for j in range(len(distinct_rows[0]))
+            ]
+            if self.origins:
+                # Rows grouped by instance, in the order they appear
+                rows = argsort(concatenate(row_ids), kind='stable')
+                indptr = concatenate(([0], cumsum(counts)))
+        for start in range(0, len(counts), block_size):
+            stop = start + block_size
+            origins = None
+            if self.origins:
+                origins = (indptr[start:stop + 1] - indptr[start],
+                           rows[indptr[start]:indptr[min(stop, len(counts))]])
+            yield start + self.offset, [
+                column[start:stop] for column in columns
+            ], counts[start:stop], origins
+
+    def _row_facts(self, start, counts, origins):
+        """Returns the count fact (followed by the origin facts, if given) of each row of a block
+        of deduplicated rows, as one list per row."""
+        from clingo import Function, Number
+        rows = []
+        for r, row_count in enumerate(counts.tolist()):
+            index = Number(start + r)
+            facts = [Function(_COUNT_FUNC, [index, Number(row_count)], True)]
+            if origins is not None:
+                indptr, origin_rows = origins
+                facts.extend(
+                    Function(_ORIGIN_FUNC, [index, Number(row)], True)
+                    for row in origin_rows[indptr[r]:indptr[r + 1]].tolist())
+            rows.append(facts)
+        return rows
+
+    def _text_block(self, start, columns, feature_names, factor,
+                    instance_func, value_func, layout='default'):
+        """Returns the text lines (one per instance) encoding a block of rows, and the number of
+        facts they hold.
+
+        The whole block is formatted with a single %-format operation over a row template, so
+        no clingo symbol is created at all. Categorical values are quoted once per distinct value.
+        """
+        n_rows = len(columns[0]) if columns else 0
+        if n_rows == 0:
+            return '', 0
+        missing = self._missing_cells(start, columns)
+        values = self._value_columns(start, columns, factor)
+        categorical = [v.dtype.kind == 'U' for v in values]
+        if missing is not None and self.missing != 'sentinel':
+            return self._missing_text_block(start, values, categorical, missing,
+                                            feature_names, instance_func,
+                                            value_func, layout)
+        row_template = _instance_template(instance_func)
+        index = arange(start, start + n_rows, dtype=int64)
+        dtype = object if any(categorical) else int64
+        if layout == 'row':
+            # Every row takes its index twice followed by all its values.
+            row_template += ' ' + _escape_format(f'{value_func}(') + '%d' + ''.join(
+                ',%s' if cat else ',%d' for cat in categorical) + ').'
+            args = empty((n_rows, 2 + len(values)), dtype=dtype)
+            args[:, :2] = index[:, None]
+            positions = range(2, 2 + len(values))
+            n_facts = 2 * n_rows
+        else:
+            # Every row takes its index once per fact followed by each value.
+            row_template += ''.join(
+                _value_templates(feature_names, value_func, categorical,
+                                 layout))
+            args = empty((n_rows, 1 + 2 * len(values)), dtype=dtype)
+            args[:, 0] = index
+            args[:, 1::2] = index[:, None]
+            positions = range(2, 2 + 2 * len(values), 2)
+            n_facts = (1 + len(values)) * n_rows
+        for position, column, cat in zip(positions, values, categorical):
+            if cat:
+                distinct, inverse = unique(column, return_inverse=True)
+                column = asarray([_quote(v) for v in distinct.tolist()],
+                                 dtype=object)[inverse]
+            args[:, position] = column
+        if missing is not None:
+            # Basic slicing gives a view, so the sentinel is written into args
+            cells = args[:, 2:] if layout == 'row' else args[:, 2::2]
+            cells[missing] = self.missing_value
+        return '\n'.join([row_template] * n_rows) % tuple(
+            args.ravel().tolist()), n_facts
+
+    def _missing_text_block(self, start, values, categorical, missing,
+                            feature_names, instance_func, value_func, layout):
+        """Returns the text lines encoding a block of rows with missing cells under the 'skip' or
+        'fact' policies, and their number of facts. Rows no longer have the same facts, so they are formatted as cells in CSR
+        layout with _format_rows."""
+        n_rows, n_values = missing.shape
+        templates = _value_templates(feature_names, value_func, categorical,
+                                     layout)
+        if self.missing == 'fact':
+            references = _missing_features(feature_names, layout)
+            dtype = object if any(categorical) else references.dtype
         else:
-            return feature_names
+            dtype = object if any(categorical) else int64
+        cells = empty((n_rows, n_values), dtype=dtype)
+        for j, (column, cat) in enumerate(zip(values, categorical)):
+            if cat:
+                distinct, inverse = unique(column, return_inverse=True)
+                column = asarray([_quote(v) for v in distinct.tolist()],
+                                 dtype=object)[inverse]
+            cells[:, j] = column
+        if self.missing == 'fact':
+            # Missing cells use the templates after the value ones
+            templates += _missing_templates(feature_names, layout)
+            cell_rows, cell_columns = missing.nonzero()
+            cells[cell_rows, cell_columns] = references[cell_columns]
+            cell_columns = (arange(n_rows * n_values) % n_values +
+                            n_values * missing.ravel())
+            indptr = arange(0, n_rows * n_values + 1, n_values)
+            cell_values = cells.ravel()
+        else:
+            present = ~missing
+            cell_columns = present.nonzero()[1]
+            indptr = concatenate(([0], cumsum(present.sum(axis=1))))
+            cell_values = cells[present]
+        # One instance fact per row and one fact per cell
+        return _format_rows(start, indptr, cell_columns, cell_values,
+                            _instance_template(instance_func),
+                            templates), n_rows + len(cell_columns)
+
+    def _fact_block(self, start, columns, fname_symbols, factor,
+                    instance_func, value_func, string_symbols,
+                    layout='default', row_facts=None):
+        """Returns the facts encoding a block of rows. fname_symbols holds the symbol identifying
+        each feature in the given layout (its name as a str for the predicate layout).
+        Categorical values are interned in string_symbols, shared by the whole encoding. The facts
+        of each row are followed by its list in row_facts, if given."""
+        from clingo import Function, Number, String
+        missing = self._missing_cells(start, columns)
+        # Each distinct value of the block is turned into a symbol once
+        value_symbols = []
+        for j, values in enumerate(self._value_columns(start, columns,
+                                                        factor)):
+            if missing is not None and values.dtype.kind != 'U':
+                # Their arbitrary ints may not fit into a clingo Number
+                values[missing[:, j]] = 0
+            distinct, inverse = unique(values, return_inverse=True)
+            if values.dtype.kind == 'U':
+                symbols = []
+                for val in distinct.tolist():
+                    if val not in string_symbols:
+                        string_symbols[val] = String(val)
+                    symbols.append(string_symbols[val])
+            else:
+                symbols = [Number(val) for val in distinct.tolist()]
+            value_symbols.append([symbols[k] for k in inverse.tolist()])
+        if missing is not None and self.missing == 'sentinel':
+            sentinel = Number(self.missing_value)
+            for j, symbols in enumerate(value_symbols):
+                for r in missing[:, j].nonzero()[0].tolist():
+                    symbols[r] = sentinel
+            missing = None
+        if missing is not None:
+            return self._missing_fact_block(start, value_symbols, missing,
+                                            fname_symbols, instance_func,
+                                            value_func, layout, row_facts)
+        block_facts = []
+        for i, row in enumerate(zip(*value_symbols), start):
+            index = Number(i)
+            block_facts.append(Function(instance_func, [index]))
+            if layout == 'row':
+                block_facts.append(Function(value_func, [index, *row], True))
+            elif layout == 'predicate':
+                block_facts.extend([
+                    Function(fname, [index, val], True)
+                    for fname, val in zip(fname_symbols, row)
+                ])
+            else:
+                block_facts.extend([
+                    Function(value_func, [index, fname_symbol, val], True)
+                    for fname_symbol, val in zip(fname_symbols, row)
+                ])
+            if row_facts is not None:
+                block_facts.extend(row_facts[i - start])
+        return block_facts
+
+    def _missing_fact_block(self, start, value_symbols, missing,
+                            fname_symbols, instance_func, value_func, layout,
+                            row_facts=None):
+        """Returns the facts encoding a block of rows with missing cells under the 'skip' or 'fact'
+        policies, see _fact_block."""
+        from clingo import Function, Number, String
+        if layout == 'predicate':
+            references = [String(fname) for fname in fname_symbols]
+        else:
+            references = fname_symbols
+        block_facts = []
+        for i, (row, row_missing) in enumerate(
+                zip(zip(*value_symbols), missing.tolist()), start):
+            index = Number(i)
+            block_facts.append(Function(instance_func, [index]))
+            for j, val in enumerate(row):
+                if row_missing[j]:
+                    if self.missing == 'fact':
+                        block_facts.append(
+                            Function(_MISSING_FUNC, [index, references[j]],
+                                     True))
+                elif layout == 'predicate':
+                    block_facts.append(
+                        Function(fname_symbols[j], [index, val], True))
+                else:
+                    block_facts.append(
+                        Function(value_func, [index, fname_symbols[j], val],
+                                 True))
+            if row_facts is not None:
+                block_facts.extend(row_facts[i - start])
+        return block_facts
+
+    def _feature_facts(self, feature_names, feature_func, layout):
+        """Returns the facts identifying the features and the symbols used by the value facts to
+        refer to them."""
+        from clingo import Function, Number, String
+        if layout in ('feature_id', 'row'):
+            fname_symbols = [Number(j) for j in range(len(feature_names))]
+            return [
+                Function(feature_func, [fname_symbol, String(fname)], True)
+                for fname_symbol, fname in zip(fname_symbols, feature_names)
+            ], fname_symbols
+        feature_facts = [
+            Function(feature_func, [String(fname)], True)
+            for fname in feature_names
+        ]
+        if layout == 'predicate':
+            return feature_facts, [str(fname) for fname in feature_names]
+        return feature_facts, [fact.arguments[0] for fact in feature_facts]
+
+    def _iter_fact_blocks(self, feature_names, factor, instance_func,
+                          feature_func, value_func, layout, blocks=None):
+        """Yields the encoded facts as lists: first the feature facts, then the facts of every block
+        of rows (all the data unless other blocks are given)."""
+        feature_facts, fname_symbols = self._feature_facts(
+            feature_names, feature_func, layout)
+        if self.stats is not None:
+            self.stats.facts += len(feature_facts)
+        yield feature_facts
+        string_symbols = {}
+        if self.deduplicate:
+            yield from self._iter_distinct_fact_blocks(fname_symbols, factor,
+                                                       instance_func,
+                                                       value_func, layout,
+                                                       string_symbols)
+            return
+        for start, columns in self._iter_timed_blocks(blocks):
+            with self._phase('symbols'):
+                block_facts = self._fact_block(start, columns, fname_symbols,
+                                               factor, instance_func,
+                                               value_func, string_symbols,
+                                               layout)
+            if self.stats is not None:
+                self.stats.rows += _block_rows(columns)
+                self.stats.facts += len(block_facts)
+            yield block_facts
+
+    def _iter_distinct_fact_blocks(self, fname_symbols, factor, instance_func,
+                                   value_func, layout, string_symbols):
+        for start, columns, counts, origins in self._iter_distinct_blocks(
+                factor):
+            with self._phase('symbols'):
+                block_facts = self._fact_block(
+                    start, columns, fname_symbols, factor, instance_func,
+                    value_func, string_symbols, layout,
+                    self._row_facts(start, counts, origins))
+            if self.stats is not None:
+                self.stats.rows += len(counts)
+                self.stats.facts += len(block_facts)
+            yield block_facts
+
+    def _iter_timed_blocks(self, blocks=None):
+        """Yields the blocks of rows (all the data unless other blocks are given), recording the
+        time taken to read them."""
+        blocks = iter(self._iter_blocks() if blocks is None else blocks)
+        while True:
+            with self._phase('read'):
+                block = next(blocks, None)
+            if block is None:
+                return
+            yield block
+
+    def _iter_text_blocks(self, feature_names, factor, instance_func,
+                          feature_func, value_func, layout):
+        """Yields the encoded program as strings: first the line of feature facts, then the lines of every block of rows."""
+        header = _feature_line(feature_names, feature_func, layout)
+        if self.stats is not None:
+            self.stats.add_text(header, len(feature_names), rows=False)
+        yield header
+        args = (feature_names, factor, instance_func, value_func, layout)
+        if self.deduplicate:
+            blocks = self._iter_distinct_text_blocks(args)
+        elif self.n_jobs > 1:
+            blocks = self._iter_parallel_text_blocks(args)
+        else:
+            blocks = self._iter_serial_text_blocks(args)
+        for block, n_facts in blocks:
+            if block:
+                if self.stats is not None:
+                    self.stats.add_text(block, n_facts)
+                yield block
+
+    def _iter_serial_text_blocks(self, args):
+        for start, columns in self._iter_timed_blocks():
+            with self._phase('format'):
+                block = self._text_block(start, columns, *args)
+            yield block
+
+    def _iter_distinct_text_blocks(self, args):
+        for start, columns, counts, origins in self._iter_distinct_blocks(
+                args[1]):
+            with self._phase('format'):
+                text, n_facts = self._text_block(start, columns, *args)
+                block = '\n'.join(
+                    map(str.__add__, text.split('\n'),
+                        _row_facts_text(start, counts, origins).split('\n')))
+            # A count fact per row, followed by its origin facts
+            n_facts += len(counts) + (0 if origins is None else len(origins[1]))
+            yield block, n_facts
+
+    def _iter_parallel_text_blocks(self, args):
+        """Encodes the blocks of rows as text in a pool of n_jobs processes, yielding them in order
+        (with their number of facts, as _text_block returns them). Only a bounded number of blocks is in flight at any time."""
+        # Kinds and edges must be known before the data is detached from the workers' copy
+        self.categorical_columns
+        if self._bins:
+            self.bin_edges
+        worker_encoder = copy(self)
+        worker_encoder._data = None
+        worker_encoder._columns = None
+        worker_encoder._appended = []
+        worker_encoder._cache = EncodingCache(0)
+
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing.shared_memory import SharedMemory
+
+        data = self._data
+        shm = None
+        # Memory maps are read block by block instead of being copied into memory
+        if isinstance(data, ndarray) and not isinstance(
+                data, memmap) and not data.dtype.hasobject:
+            shm = SharedMemory(create=True, size=max(data.nbytes, 1))
+            ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)[:] = data
+            initargs = (worker_encoder, shm.name, data.shape, data.dtype.str)
+            n_rows = data.shape[0]
+            tasks = chain(((start, min(start + _BLOCK_SIZE, n_rows), None)
+                           for start in range(0, n_rows, _BLOCK_SIZE)),
+                          ((start, None, columns)
+                           for start, columns in self._iter_appended_blocks()))
+        else:
+            initargs = (worker_encoder, None, None, None)
+            tasks = ((start, None, columns)
+                     for start, columns in self._iter_timed_blocks())
+
+        try:
+            with ProcessPoolExecutor(self.n_jobs,
+                                     initializer=_init_worker,
+                                     initargs=initargs) as executor:
+                pending = deque()
+                for task in tasks:
+                    pending.append(
+                        executor.submit(_text_block_task, *task, args))
+                    if len(pending) >= 2 * self.n_jobs:
+                        with self._phase('format'):
+                            block = pending.popleft().result()
+                        yield block
+                while pending:
+                    with self._phase('format'):
+                        block = pending.popleft().result()
+                    yield block
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
 
     def as_clingo_facts(self,
                         feature_names=None,
                         factor=None,
                         instance_func='instance',
                         feature_func='feature',
-                        value_func='value'):
+                        value_func='value',
+                        layout='default'):
         """Returns the data as clingo Function objects. Includes one function identifying
         each instance, one function identifying each feature name,  and one function for 
         each instance's value.
@@ -82,52 +1417,68 @@ class Encoder:
             instance_func (str, optional): name for the function used for identifying each instance. Defaults to 'instance'.
             feature_func (str, optional): name for the function used for identifying each feature. Defaults to 'feature'.
             value_func (str, optional): name for the function used for encoding each value. Defaults to 'value'.
+            layout (str, optional): layout of the facts. 'default' gives feature("name"), instance(i) and value(i,"name",v) facts. 'feature_id' refers to the features by their position: feature(id,"name") and value(i,id,v). 'row' encodes all the values of an instance in a single value(i,v1,...,vn) fact, also with feature(id,"name"). 'predicate' uses one predicate per feature, name(i,v), and requires the feature names to be valid ASP identifiers. Defaults to 'default'.
 
         Returns:
             [Iterable[clingo.Function]]: an iterable over clingo Function objects representing the data.
         """
         feature_names = self._get_feature_names(feature_names)
+        _check_layout(layout, feature_names, self.missing)
         if factor is None:
             factor = self.factor
-        mult = 10**factor
 
         # Check cache
-        if self._check_facts_cache(feature_names, factor, instance_func,
-                                   feature_func, value_func):
-            return self._facts_cache
+        key = self._cache_key('facts', feature_names, factor, instance_func,
+                              feature_func, value_func, layout)
+        clingo_facts = self._cache.get(key)
+        if clingo_facts is not None:
+            self._cache_hit()
+            return clingo_facts
 
-        # Feature facts
-        clingo_facts = [
-            Function(feature_func, [String(fname)], True)
-            for fname in feature_names
-        ]
-        # Instance and Value facts
-        n_rows, _ = self.data.shape
-        for i in range(n_rows):
-            clingo_facts.append(Function(instance_func, [Number(i)]))
-            clingo_facts.extend([
-                Function(value_func, [
-                    Number(i),
-                    String(fname),
-                    Number(int(round(val * mult))) if numerical else Number(
-                        int(val)),
-                ], True) for fname, numerical, val in zip(
-                    feature_names, self._numerical_columns, self.data[i])
-            ])
+        clingo_facts = []
+        for block_facts in self._iter_fact_blocks(feature_names, factor,
+                                                  instance_func, feature_func,
+                                                  value_func, layout):
+            clingo_facts.extend(block_facts)
 
         # Set cache
-        self._facts_cache = clingo_facts
-        self._last_call = (feature_names, factor, instance_func, feature_func,
-                           value_func)
+        self._cache.put(key, clingo_facts, facts_size(clingo_facts))
 
-        return self._facts_cache
+        return clingo_facts
+
+    def iter_clingo_facts(self,
+                          feature_names=None,
+                          factor=None,
+                          instance_func='instance',
+                          feature_func='feature',
+                          value_func='value',
+                          layout='default'):
+        """Lazy counterpart of as_clingo_facts. Facts are produced while iterating, so only a
+        block of rows is held in memory at any time. Nothing is cached.
+
+        Args:
+            Same as as_clingo_facts.
+
+        Yields:
+            [clingo.Function]: the facts in the same order as as_clingo_facts returns them.
+        """
+        feature_names = self._get_feature_names(feature_names)
+        _check_layout(layout, feature_names, self.missing)
+        if factor is None:
+            factor = self.factor
+
+        for block_facts in self._iter_fact_blocks(feature_names, factor,
+                                                  instance_func, feature_func,
+                                                  value_func, layout):
+            yield from block_facts
 
     def as_program_string(self,
                           feature_names=None,
                           factor=None,
                           instance_func='instance',
                           feature_func='feature',
-                          value_func='value'):
+                          value_func='value',
+                          layout='default'):
         """Returns the data as a ASP program in a string. Includes one function identifying
         each instance, one function identifying each feature name,  and one function for 
         each instance's value.
@@ -140,37 +1491,358 @@ class Encoder:
             instance_func (str, optional): name for the function used for identifying each instance. Defaults to 'instance'.
             feature_func (str, optional): name for the function used for identifying each feature. Defaults to 'feature'.
             value_func (str, optional): name for the function used for encoding each value. Defaults to 'value'.
+            layout (str, optional): layout of the facts. 'default' gives feature("name"), instance(i) and value(i,"name",v) facts. 'feature_id' refers to the features by their position: feature(id,"name") and value(i,id,v). 'row' encodes all the values of an instance in a single value(i,v1,...,vn) fact, also with feature(id,"name"). 'predicate' uses one predicate per feature, name(i,v), and requires the feature names to be valid ASP identifiers. Defaults to 'default'.
 
         Returns:
             [str]: a string containig the data encoded as an ASP program.
         """
-        def fact_lines(feature_names, clingo_facts):
-            len_features = len(feature_names)
-            len_rows = len_features + 1
-            yield clingo_facts[0:len_features]
-            for i in range(len_features, len(clingo_facts), len_rows):
-                yield clingo_facts[i:i + len_rows]
+        feature_names = self._get_feature_names(feature_names)
+        _check_layout(layout, feature_names, self.missing)
+        if factor is None:
+            factor = self.factor
+
+        key = self._cache_key('text', feature_names, factor, instance_func,
+                              feature_func, value_func, layout)
+        text = self._cache.get(key)
+        if text is not None:
+            self._cache_hit()
+            return text
+
+        path = self._disk_path(key)
+        if path is not None:
+            self._cache_hit()
+            with self._phase('read'), open(path, newline='') as cachefile:
+                text = cachefile.read()
+        else:
+            text = "\n".join(
+                self._iter_text_blocks(feature_names, factor, instance_func,
+                                       feature_func, value_func, layout))
+            disk_key = self._disk_key(key)
+            if disk_key is not None:
+                self._disk_cache.put(disk_key, text)
+        self._cache.put(key, text, text_size(text))
+        return text
+
+    def iter_program_lines(self,
+                           feature_names=None,
+                           factor=None,
+                           instance_func='instance',
+                           feature_func='feature',
+                           value_func='value',
+                           layout='default'):
+        """Lazy counterpart of as_program_string. Yields the program line by line (the line of
+        feature facts first, then one line per instance) without the trailing line break.
+        Lines are formatted a block of rows at a time, so memory does not grow with the data
+        size. Nothing is cached, but programs in the disk cache are read from it.
+
+        Args:
+            Same as as_program_string.
+
+        Yields:
+            [str]: the lines of the program.
+        """
+        feature_names = self._get_feature_names(feature_names)
+        _check_layout(layout, feature_names, self.missing)
+        if factor is None:
+            factor = self.factor
+
+        path = self._disk_path(
+            self._cache_key('text', feature_names, factor, instance_func,
+                            feature_func, value_func, layout))
+        if path is not None:
+            self._cache_hit()
+            with open(path, newline='') as cachefile:
+                for line in cachefile:
+                    yield line.rstrip('\n')
+            return
+
+        for block in self._iter_text_blocks(feature_names, factor,
+                                            instance_func, feature_func,
+                                            value_func, layout):
+            yield from block.split("\n")
+
+    def write_program(self,
+                      fileobj,
+                      feature_names=None,
+                      factor=None,
+                      instance_func='instance',
+                      feature_func='feature',
+                      value_func='value',
+                      layout='default'):
+        """Writes the program returned by as_program_string into a text file object. The program
+        is written a block of rows at a time, so the whole string is never built in memory and
+        the first lines are available to the reader as soon as they are encoded. With a disk
+        cache, a cached program is copied from it and a new one is stored while it is written.
 
+        Args:
+            fileobj ([TextIO]): writable text file object (an open file, sys.stdout, gzip.open(path, 'wt'), etc.).
+            Rest of arguments are the same as as_program_string.
+        """
         feature_names = self._get_feature_names(feature_names)
+        _check_layout(layout, feature_names, self.missing)
         if factor is None:
             factor = self.factor
 
-        if self._check_text_cache(feature_names, factor, instance_func,
-                                  feature_func, value_func):
-            return self._text_cache
+        key = self._cache_key('text', feature_names, factor, instance_func,
+                              feature_func, value_func, layout)
+        text = self._cache.get(key)
+        if text is not None:
+            self._cache_hit()
+            with self._phase('write'):
+                fileobj.write(text)
+            return
+
+        path = self._disk_path(key)
+        if path is not None:
+            self._cache_hit()
+            with self._phase('write'), open(path, newline='') as cachefile:
+                shutil.copyfileobj(cachefile, fileobj)
+            return
+
+        disk_key = self._disk_key(key)
+        with nullcontext() if disk_key is None else self._disk_cache.writer(
+                disk_key) as cachefile:
+            outputs = [fileobj] if cachefile is None else [fileobj, cachefile]
+            blocks = self._iter_text_blocks(feature_names, factor,
+                                            instance_func, feature_func,
+                                            value_func, layout)
+            first = next(blocks)
+            with self._phase('write'):
+                for output in outputs:
+                    output.write(first)
+            for block in blocks:
+                with self._phase('write'):
+                    for output in outputs:
+                        output.write("\n")
+                        output.write(block)
+
+    def add_to_control(self,
+                       ctl,
+                       feature_names=None,
+                       factor=None,
+                       instance_func='instance',
+                       feature_func='feature',
+                       value_func='value',
+                       layout='default'):
+        """Adds the facts of the program returned by as_program_string to a clingo Control object
+        and grounds them, so they are visible to the rules grounded afterwards.
 
-        clingo_facts = self.as_clingo_facts(feature_names=feature_names,
-                                            factor=factor,
-                                            instance_func=instance_func,
-                                            feature_func=feature_func,
-                                            value_func=value_func)
-        self._text_cache = "\n".join(
-            " ".join([str(f) + "." for f in list])
-            for list in fact_lines(feature_names, clingo_facts))
-        return self._text_cache
+        The program is added a block of rows at a time, each block as its own program part which
+        is grounded right away, so the whole program string is never built. Facts already cached
+        by as_clingo_facts are added through the backend of the Control instead, skipping
+        clingo's parser. Parsing and grounding the facts takes most of the time, so adding the
+        text of as_program_string to the Control is about as fast, unless the facts are cached.
+
+        Args:
+            ctl ([clingo.Control]): control object the facts are added to.
+            Rest of arguments are the same as as_clingo_facts.
+        """
+        feature_names = self._get_feature_names(feature_names)
+        _check_layout(layout, feature_names, self.missing)
+        if factor is None:
+            factor = self.factor
+
+        clingo_facts = self._cache.get(
+            self._cache_key('facts', feature_names, factor, instance_func,
+                            feature_func, value_func, layout))
+        if clingo_facts is not None:
+            self._cache_hit()
+            with ctl.backend() as backend, self._phase('backend'):
+                add_atom, add_rule = backend.add_atom, backend.add_rule
+                for fact in clingo_facts:
+                    add_rule([add_atom(fact)])
+            return
+
+        key = self._cache_key('text', feature_names, factor, instance_func,
+                              feature_func, value_func, layout)
+        text = self._cache.get(key)
+        path = None if text is not None else self._disk_path(key)
+        if text is not None or path is not None:
+            self._cache_hit()
+            if path is not None:
+                with self._phase('read'), open(path, newline='') as cachefile:
+                    text = cachefile.read()
+            blocks = [text]
+        else:
+            blocks = self._iter_text_blocks(feature_names, factor,
+                                            instance_func, feature_func,
+                                            value_func, layout)
+        for block in blocks:
+            part = f'{_CONTROL_PART}{next(_control_parts)}'
+            with self._phase('backend'):
+                ctl.add(part, [], block)
+                ctl.ground([(part, [])])
+
+    async def aencode_program(self, *args, executor=None, **kwargs):
+        """Asynchronous counterpart of as_program_string. The program is encoded in an executor,
+        so the event loop is not blocked meanwhile.
+
+        Args:
+            executor ([concurrent.futures.ThreadPoolExecutor], optional): thread executor running the encoding. Process executors are not supported, as the encoding runs over the state of the encoder (use n_jobs for encoding in several processes). If None, the default executor of the event loop is used. Defaults to None.
+            Rest of arguments are the same as as_program_string.
+
+        Returns:
+            [str]: a string containig the data encoded as an ASP program.
+        """
+        import asyncio
+        _check_executor(executor)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, partial(self.as_program_string, *args, **kwargs))
+
+    async def aencode_facts(self, *args, executor=None, **kwargs):
+        """Asynchronous counterpart of as_clingo_facts. The facts are encoded in an executor, so
+        the event loop is not blocked meanwhile.
+
+        Args:
+            executor ([concurrent.futures.ThreadPoolExecutor], optional): thread executor running the encoding. Process executors are not supported, as the encoding runs over the state of the encoder (use n_jobs for encoding in several processes). If None, the default executor of the event loop is used. Defaults to None.
+            Rest of arguments are the same as as_clingo_facts.
+
+        Returns:
+            [List[clingo.Function]]: the facts representing the data.
+        """
+        import asyncio
+        _check_executor(executor)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, partial(self.as_clingo_facts, *args, **kwargs))
+
+    async def aiter_program_lines(self, *args, executor=None, **kwargs):
+        """Asynchronous counterpart of iter_program_lines. Lines are encoded in an executor a
+        block at a time, giving control back to the event loop between blocks.
+
+        Args:
+            executor ([concurrent.futures.ThreadPoolExecutor], optional): thread executor running the encoding. Process executors are not supported, as the encoding runs over the state of the encoder (use n_jobs for encoding in several processes). If None, the default executor of the event loop is used. Defaults to None.
+            Rest of arguments are the same as as_program_string.
+
+        Yields:
+            [str]: the lines of the program.
+        """
+        lines = self.iter_program_lines(*args, **kwargs)
+        async for batch in _abatches(lines, executor):
+            for line in batch:
+                yield line
+
+    async def aiter_clingo_facts(self, *args, executor=None, **kwargs):
+        """Asynchronous counterpart of iter_clingo_facts. Facts are encoded in an executor a
+        block at a time, giving control back to the event loop between blocks.
+
+        Args:
+            executor ([concurrent.futures.ThreadPoolExecutor], optional): thread executor running the encoding. Process executors are not supported, as the encoding runs over the state of the encoder (use n_jobs for encoding in several processes). If None, the default executor of the event loop is used. Defaults to None.
+            Rest of arguments are the same as as_clingo_facts.
+
+        Yields:
+            [clingo.Function]: the facts in the same order as as_clingo_facts returns them.
+        """
+        facts = self.iter_clingo_facts(*args, **kwargs)
+        async for batch in _abatches(facts, executor):
+            for fact in batch:
+                yield fact
+
+    async def awrite_program(self, fileobj, *args, executor=None, **kwargs):
+        """Asynchronous counterpart of write_program. The program is encoded in an executor a
+        block at a time and written as each block is ready.
+
+        Args:
+            fileobj ([TextIO]): text file object the program is written to. Its write method may be a coroutine (e.g. an asynchronous stream), which is awaited.
+            executor ([concurrent.futures.ThreadPoolExecutor], optional): thread executor running the encoding. Process executors are not supported, as the encoding runs over the state of the encoder (use n_jobs for encoding in several processes). If None, the default executor of the event loop is used. Defaults to None.
+            Rest of arguments are the same as as_program_string.
+        """
+        separator = ""
+        lines = self.iter_program_lines(*args, **kwargs)
+        async for batch in _abatches(lines, executor):
+            written = fileobj.write(separator + "\n".join(batch))
+            if isawaitable(written):
+                await written
+            separator = "\n"
+
+    def append(self,
+               rows,
+               return_facts=False,
+               feature_names=None,
+               factor=None,
+               instance_func='instance',
+               feature_func='feature',
+               value_func='value',
+               layout='default'):
+        """Appends rows to the data. New instances are numbered after the existing ones. Only the
+        new rows are encoded: every cached encoding is extended with them instead of being
+        recomputed. Encodings returned before the call are left unchanged.
+
+        Args:
+            rows ([2D matrix]): rows to be appended, with the same columns as the data.
+            return_facts (bool, optional): if True, the facts encoding only the new rows are returned, ready for being added to a running clingo.Control (e.g. through its backend). Defaults to False.
+            Rest of arguments are the same as as_clingo_facts, and are only used for the returned facts.
+
+        Raises:
+            ValueError: if rows do not have the same number of columns as the data.
+
+        Returns:
+            [List[clingo.Function]]: the instance and value facts of the new rows when return_facts is True, None otherwise.
+        """
+        rows = asarray(rows)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        if rows.ndim != 2 or rows.shape[1] != self._n_columns():
+            raise ValueError("'rows' shape does not match data shape.")
+        if rows.shape[0] == 0:
+            return [] if return_facts else None
+        start = self._n_source_rows() + self._n_appended + self.offset
+        columns = [ascontiguousarray(rows[:, j]) for j in range(rows.shape[1])]
+        if self._categorical is not None:
+            # The kinds of the columns are already decided, the new rows must follow them
+            self._value_columns(start, columns, self.factor)
+        if self.deduplicate:
+            if return_facts:
+                raise ValueError(
+                    "'return_facts' is not available for deduplicated data.")
+            # New rows may repeat existing ones, so encodings cannot be extended
+            self._appended.append(columns)
+            self._n_appended += rows.shape[0]
+            self._cache.clear()
+            return None
+
+        self._appended.append(columns)
+        self._n_appended += rows.shape[0]
+
+        delta_facts = None
+        if return_facts:
+            feature_names = self._get_feature_names(feature_names)
+            _check_layout(layout, feature_names, self.missing)
+            if factor is None:
+                factor = self.factor
+            delta_key = self._cache_key('facts', feature_names, factor,
+                                        instance_func, feature_func,
+                                        value_func, layout)
+
+        # Only the new segment is built, cached encodings are joined when read
+        for key in self._cache.keys():
+            kind, names, key_factor, key_instance, key_feature, key_value, key_layout = key
+            if kind == 'facts':
+                delta = self._fact_block(
+                    start, columns,
+                    self._feature_facts(names, key_feature, key_layout)[1],
+                    key_factor, key_instance, key_value, {}, key_layout)
+                if return_facts and key == delta_key:
+                    delta_facts = list(delta)
+                self._cache.extend(key, delta, facts_size(delta))
+            else:
+                delta = "\n" + self._text_block(start, columns, names,
+                                                key_factor, key_instance,
+                                                key_value, key_layout)[0]
+                self._cache.extend(key, delta, text_size(delta))
+
+        if return_facts and delta_facts is None:
+            delta_facts = self._fact_block(
+                start, columns,
+                self._feature_facts(feature_names, feature_func, layout)[1],
+                factor, instance_func, value_func, {}, layout)
+        return delta_facts
 
 
 class CsvEncoder(Encoder):
+    _pending_load = False
+
     def __init__(self,
                  csv_path,
                  feature_names=None,
@@ -178,29 +1850,335 @@ class CsvEncoder(Encoder):
                  numerical_columns=None,
                  have_names=False,
                  omit_names=False,
-                 delimiter=','):
+                 delimiter=',',
+                 chunksize=None,
+                 n_jobs=1,
+                 cache_size=_CACHE_SIZE,
+                 usecols=None,
+                 engine='csv',
+                 bins=None,
+                 bin_strategy='uniform',
+                 bin_mode='replace',
+                 cache_dir=None,
+                 cache_dir_size=_DISK_CACHE_SIZE,
+                 cache_by_hash=False,
+                 stats=False,
+                 offset=0,
+                 missing='error',
+                 missing_value=0,
+                 deduplicate=False,
+                 origins=False):
         """Encodes a csv file as a set of ASP facts. If no feature_names are provided (neither manually or from the csv file), they will be automatically created as 'f1', 'f2', etc. Behaviour is not controlled when 'have_names' setted accordingly.
 
+        Columns are stored with the type inferred from their values: integer columns are kept as the smallest int type holding them and the rest as float.
+
         Args:
             csv_path ([str]): path to the csv file.
             feature_names (Iterable[str], optional): Names of the features/columns. Will overwrite the names retrieved from the file in such a case. Defaults to None.
             have_names (bool, optional): Must be true if the csv file contains the name of the columns in the first line. Defaults to False.
             omit_names (bool, optional): Set to True if user wants to ignore the column names from the file. Defaults to False.
             delimiter (str, optional): Csv delimiter used in the csv file. Defaults to ','.
+            chunksize (int, optional): if given, the file is not loaded at creation. Instead, it is read in blocks of 'chunksize' rows every time it is encoded, so memory stays bounded by the block size. 'data' will be None in such a case. The first encoding takes an extra pass over the file to find its categorical columns (see Encoder.categorical_columns), so every block is encoded the same way. Defaults to None.
+            n_jobs (int, optional): number of processes used for encoding the data as text. -1 means using all the CPUs. Defaults to 1.
+            cache_size (int, optional): maximum number of bytes taken by the cached encodings. 0 disables the cache. Defaults to 1 GiB.
+            usecols (Iterable[int or str], optional): indexes (or names, when have_names is True) of the only columns to be read, in the order they will be encoded. The rest of columns are never parsed. feature_names and numerical_columns refer to the selected columns. Defaults to None.
+            engine (str, optional): csv parser. 'csv' uses numpy's C parser (numpy.loadtxt), falling back to Python's csv module for blocks with missing or non numerical cells. 'pandas' uses pandas.read_csv (with its default C engine), which must be installed. Defaults to 'csv'.
+            bins, bin_strategy, bin_mode: discretization of the columns, see Encoder.
+            cache_dir (str, optional): directory where the encoded programs are cached, so encoding the same unchanged file again (even from another process) only copies the cached program. The file is not parsed until some data is needed. Only text encodings are cached on disk. Defaults to None.
+            cache_dir_size (int, optional): maximum number of bytes taken by the programs in cache_dir. The least recently used ones are deleted first. Defaults to 4 GiB.
+            cache_by_hash (bool, optional): if True, the file is identified in cache_dir by the hash of its content. Otherwise, by its path, size and modification time, which does not require reading it. Defaults to False.
+            stats (bool, optional): if True, the encoding phases (including the parsing at creation) are recorded in the 'stats' attribute. Defaults to False.
+            offset (int, optional): index of the first instance. Defaults to 0.
+            missing, missing_value: policy for empty cells (nan in numerical columns), see Encoder.
+            deduplicate, origins: encoding of repeated rows once, with count(i,n) facts, see Encoder.
         """
-        if have_names == False:  # csv do not have headers
-            data = genfromtxt(csv_path, delimiter=delimiter)
-        else:
-            data = genfromtxt(csv_path, skip_header=1, delimiter=delimiter)
-            if feature_names is None and omit_names == False:  # and names==True
-                with open(csv_path, 'r') as csvfile:
-                    reader = csv.reader(csvfile, delimiter=delimiter)
-                    feature_names = next(reader)
+        if engine not in ('csv', 'pandas'):
+            raise ValueError("'engine' must be 'csv' or 'pandas'.")
+        if chunksize is not None and chunksize < 1:
+            raise ValueError("'chunksize' must be a positive int.")
 
-        super().__init__(data,
+        self.csv_path = csv_path
+        self.have_names = have_names
+        self.delimiter = delimiter
+        self.chunksize = chunksize
+        self.engine = engine
+        self.cache_by_hash = cache_by_hash
+        if cache_dir is not None:
+            self._disk_cache = DiskCache(cache_dir, cache_dir_size)
+
+        with open(csv_path, 'r') as csvfile:
+            header = None
+            if have_names:
+                header = next(csv.reader([csvfile.readline()],
+                                         delimiter=delimiter))
+            self.usecols = _resolve_usecols(usecols, header)
+            if header is not None and feature_names is None and omit_names == False:
+                feature_names = header if self.usecols is None else [
+                    header[i] for i in self.usecols
+                ]
+
+            data_start = csvfile.tell()
+            first_line = csvfile.readline()
+            csvfile.seek(data_start)
+            if self.usecols is None:
+                self._stream_columns = len(
+                    next(csv.reader([first_line], delimiter=delimiter), []))
+            else:
+                self._stream_columns = len(self.usecols)
+
+            # With a disk cache, the file is not parsed unless its program is not cached
+            self._pending_load = chunksize is None and cache_dir is not None
+            read_start = perf_counter()
+            if chunksize is None and not self._pending_load:
+                self._columns = self._read_columns(csvfile)
+            read_time = perf_counter() - read_start
+
+        super().__init__(None,
                          feature_names=feature_names,
                          factor=factor,
-                         numerical_columns=numerical_columns)
+                         numerical_columns=numerical_columns,
+                         n_jobs=n_jobs,
+                         cache_size=cache_size,
+                         bins=bins,
+                         bin_strategy=bin_strategy,
+                         bin_mode=bin_mode,
+                         stats=stats,
+                         offset=offset,
+                         missing=missing,
+                         missing_value=missing_value,
+                         deduplicate=deduplicate,
+                         origins=origins)
+        if self.stats is not None:
+            self.stats.add_time('read', read_time)
+
+    def _read_columns(self, csvfile):
+        """Parses the whole file, from the current position of csvfile, into typed columns."""
+        if self.engine == 'pandas':
+            return _frame_columns(self._read_pandas(), self.usecols)
+        return _parse_csv(csvfile, self.delimiter, self.usecols,
+                          self._stream_columns)
+
+    def _load_columns(self):
+        """Parses the file if it was deferred until its data is needed."""
+        if self._pending_load:
+            self._pending_load = False
+            with open(self.csv_path, 'r') as csvfile:
+                if self.have_names:
+                    csvfile.readline()
+                self._columns = self._read_columns(csvfile)
+
+    @property
+    def data(self):
+        self._load_columns()
+        return super().data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+
+    def _source_key(self):
+        return (_file_key(self.csv_path, self.cache_by_hash), self.delimiter,
+                self.have_names, self.usecols, self.engine)
+
+    def _read_pandas(self, chunksize=None, categorical=None):
+        """Reads the file with pandas.read_csv. Columns marked in categorical are read as str."""
+        import pandas
+        dtype = None
+        if categorical is not None:
+            labels = range(len(categorical)) if self.usecols is None else self.usecols
+            dtype = {label: str for label, cat in zip(labels, categorical) if cat}
+        return pandas.read_csv(self.csv_path,
+                               sep=self.delimiter,
+                               header=None,
+                               skiprows=1 if self.have_names else 0,
+                               usecols=self.usecols,
+                               chunksize=chunksize,
+                               dtype=dtype)
+
+    def _n_columns(self):
+        if self._columns is None:
+            return self._stream_columns
+        return super()._n_columns()
+
+    def _iter_chunks(self):
+        """Yields the typed columns of every block of 'chunksize' rows of the file. Once the kinds
+        of the columns are known (see categorical_columns), categorical columns are kept as such
+        in every chunk."""
+        # None while the kinds are being found
+        categorical = self._categorical
+        if self.engine == 'pandas':
+            with self._read_pandas(self.chunksize, categorical) as reader:
+                for frame in reader:
+                    yield _frame_columns(frame, self.usecols, categorical)
+            return
+
+        with open(self.csv_path, 'r') as csvfile:
+            if self.have_names:
+                csvfile.readline()
+            while True:
+                lines = list(islice(csvfile, self.chunksize))
+                if not lines:
+                    break
+                yield _parse_csv(lines, self.delimiter, self.usecols,
+                                 self._stream_columns, categorical)
+
+    def _iter_source_blocks(self, block_size=_BLOCK_SIZE):
+        self._load_columns()
+        if self._columns is not None:
+            yield from super()._iter_source_blocks(block_size)
+            return
+
+        yield from _split_chunks(self._iter_chunks(), block_size)
+
+
+class ArrowEncoder(Encoder):
+    def __init__(self,
+                 path,
+                 feature_names=None,
+                 factor=0,
+                 numerical_columns=None,
+                 usecols=None,
+                 file_format=None,
+                 n_jobs=1,
+                 cache_size=_CACHE_SIZE,
+                 bins=None,
+                 bin_strategy='uniform',
+                 bin_mode='replace',
+                 cache_dir=None,
+                 cache_dir_size=_DISK_CACHE_SIZE,
+                 cache_by_hash=False,
+                 stats=False,
+                 offset=0,
+                 missing='error',
+                 missing_value=0,
+                 deduplicate=False,
+                 origins=False):
+        """Encodes a Parquet or Arrow IPC (Feather) file as a set of ASP facts. pyarrow must be installed. If no feature_names are provided, the names of the columns in the file are used.
+
+        The file is never loaded as a whole: it is read one row group (Parquet) or record batch (Arrow IPC) at a time every time it is encoded, so memory stays bounded by their size. Only the selected columns are read. Numerical columns without nulls are used as NumPy arrays without copies, and 'data' is None.
+
+        Args:
+            path ([str]): path to the file.
+            feature_names (Iterable[str], optional): Names of the features/columns. Will overwrite the names in the file in such a case. Defaults to None.
+            usecols (Iterable[int or str], optional): indexes or names of the only columns to be read, in the order they will be encoded. feature_names and numerical_columns refer to the selected columns. Defaults to None.
+            file_format (str, optional): 'parquet' or 'ipc'. If None, it is given by the extension of the file (.parquet and .pq for Parquet, .arrow, .feather and .ipc for Arrow IPC). Defaults to None.
+            n_jobs (int, optional): number of processes used for encoding the data as text. -1 means using all the CPUs. Defaults to 1.
+            cache_size (int, optional): maximum number of bytes taken by the cached encodings. 0 disables the cache. Defaults to 1 GiB.
+            bins, bin_strategy, bin_mode: discretization of the columns, see Encoder.
+            cache_dir, cache_dir_size, cache_by_hash: disk cache of the encoded programs, see CsvEncoder.
+            stats (bool, optional): if True, the encoding phases are recorded in the 'stats' attribute. Defaults to False.
+            offset (int, optional): index of the first instance. Defaults to 0.
+            missing, missing_value: policy for null cells, see Encoder.
+            deduplicate, origins: encoding of repeated rows once, with count(i,n) facts, see Encoder.
+        """
+        if file_format is None:
+            file_format = _arrow_format(path)
+            if file_format is None:
+                raise ValueError(
+                    f"Unknown Arrow file extension, use one of {', '.join(_ARROW_FORMATS)} or give 'file_format'."
+                )
+        elif file_format not in ('parquet', 'ipc'):
+            raise ValueError("'file_format' must be 'parquet' or 'ipc'.")
+
+        self.path = path
+        self.file_format = file_format
+        self.cache_by_hash = cache_by_hash
+        if cache_dir is not None:
+            self._disk_cache = DiskCache(cache_dir, cache_dir_size)
+
+        with self._open() as source:
+            names = self._schema_names(source)
+            self.usecols = _resolve_usecols(usecols, names)
+            if self.usecols is None:
+                self.usecols = list(range(len(names)))
+            if feature_names is None:
+                feature_names = [names[i] for i in self.usecols]
+
+        super().__init__(None,
+                         feature_names=feature_names,
+                         factor=factor,
+                         numerical_columns=numerical_columns,
+                         n_jobs=n_jobs,
+                         cache_size=cache_size,
+                         bins=bins,
+                         bin_strategy=bin_strategy,
+                         bin_mode=bin_mode,
+                         stats=stats,
+                         offset=offset,
+                         missing=missing,
+                         missing_value=missing_value,
+                         deduplicate=deduplicate,
+                         origins=origins)
+
+    @contextmanager
+    def _open(self):
+        """Context manager yielding a reader of the file, which is memory mapped."""
+        import pyarrow
+        with pyarrow.memory_map(os.fspath(self.path)) as source:
+            if self.file_format == 'parquet':
+                from pyarrow.parquet import ParquetFile
+                yield ParquetFile(source)
+            else:
+                from pyarrow import ipc
+                yield ipc.open_file(source)
+
+    def _schema(self, source):
+        if self.file_format == 'parquet':
+            return source.schema_arrow
+        return source.schema
+
+    def _schema_names(self, source):
+        return self._schema(source).names
+
+    def _source_key(self):
+        return (_file_key(self.path, self.cache_by_hash), self.file_format,
+                self.usecols)
+
+    def _n_columns(self):
+        return len(self.usecols)
+
+    def _find_categorical(self):
+        """Columns are categorical when their type in the schema is not numerical, so the file is
+        not read."""
+        from pyarrow import types
+        with self._open() as source:
+            schema = self._schema(source)
+        categorical = []
+        for j, i in enumerate(self.usecols):
+            kind = schema.field(i).type
+            numerical = (types.is_integer(kind) or types.is_floating(kind)
+                         or types.is_boolean(kind) or types.is_decimal(kind))
+            categorical.append(not numerical and not (
+                self._given_numerical and self._numerical_columns[j]))
+        return categorical
+
+    def _n_source_rows(self):
+        if self._source_rows is None:
+            with self._open() as source:
+                if self.file_format == 'parquet':
+                    self._source_rows = source.metadata.num_rows
+                else:
+                    self._source_rows = sum(
+                        source.get_batch(i).num_rows
+                        for i in range(source.num_record_batches))
+        return self._source_rows
+
+    def _iter_chunks(self):
+        """Yields the typed columns of every row group or record batch of the file."""
+        with self._open() as source:
+            if self.file_format == 'parquet':
+                names = self._schema_names(source)
+                columns = [names[i] for i in self.usecols]
+                for i in range(source.num_row_groups):
+                    table = source.read_row_group(i, columns=columns)
+                    yield [_arrow_column(column) for column in table.columns]
+            else:
+                for i in range(source.num_record_batches):
+                    batch = source.get_batch(i)
+                    yield [_arrow_column(batch.column(j)) for j in self.usecols]
+
+    def _iter_source_blocks(self, block_size=_BLOCK_SIZE):
+        yield from _split_chunks(self._iter_chunks(), block_size)
 
 
 class NumpyLikeEncoder(Encoder):
@@ -208,16 +2186,260 @@ class NumpyLikeEncoder(Encoder):
                  data,
                  feature_names=None,
                  factor=0,
-                 numerical_columns=None):
+                 numerical_columns=None,
+                 n_jobs=1,
+                 cache_size=_CACHE_SIZE,
+                 bins=None,
+                 bin_strategy='uniform',
+                 bin_mode='replace',
+                 stats=False,
+                 offset=0,
+                 missing='error',
+                 missing_value=0,
+                 deduplicate=False,
+                 origins=False):
         """Encodes a (2D matrix) numpy array-like variable as a set of ASP Facts. Any type which accepts np.asarray(var) should work. If no feature_names are provided, they will be automatically created as 'f1', 'f2', etc.
 
+        NumPy arrays (including memory maps, e.g. from np.load(path, mmap_mode='r')) are used as they are, without copies. Rows are read sequentially while encoding.
+
+        pandas DataFrames are not converted into a single matrix: each column is kept as an array of its own dtype. Columns of category, string or object dtype holding non numerical values are encoded as categorical.
+
         Args:
             data (2d matrix): data to be encoded.
             feature_names (Iterable[str], optional): Names for the features/columns. Defaults to None.
+            n_jobs (int, optional): number of processes used for encoding the data as text. -1 means using all the CPUs. Defaults to 1.
+            cache_size (int, optional): maximum number of bytes taken by the cached encodings. 0 disables the cache. Defaults to 1 GiB.
+            bins, bin_strategy, bin_mode: discretization of the columns, see Encoder.
+            stats (bool, optional): if True, the encoding phases are recorded in the 'stats' attribute. Defaults to False.
+            offset (int, optional): index of the first instance. Defaults to 0.
+            missing, missing_value: policy for missing cells, see Encoder.
+            deduplicate, origins: encoding of repeated rows once, with count(i,n) facts, see Encoder.
         """
         if feature_names is None and hasattr(data, 'columns'):
             feature_names = list(data.columns)
-        super().__init__(asarray(data),
+        if hasattr(data, 'columns') and hasattr(data, 'dtypes'):
+            # pandas DataFrame, encoded column by column
+            self._columns = [
+                _frame_column(data.iloc[:, j]) for j in range(data.shape[1])
+            ]
+            data = None
+        elif not isinstance(data, ndarray):
+            data = asarray(data)
+        super().__init__(data,
                          feature_names=feature_names,
                          factor=factor,
-                         numerical_columns=numerical_columns)
+                         numerical_columns=numerical_columns,
+                         n_jobs=n_jobs,
+                         cache_size=cache_size,
+                         bins=bins,
+                         bin_strategy=bin_strategy,
+                         bin_mode=bin_mode,
+                         stats=stats,
+                         offset=offset,
+                         missing=missing,
+                         missing_value=missing_value,
+                         deduplicate=deduplicate,
+                         origins=origins)
+
+
+class SparseEncoder(Encoder):
+    def __init__(self,
+                 data,
+                 feature_names=None,
+                 factor=0,
+                 numerical_columns=None,
+                 skip_default=True,
+                 n_jobs=1,
+                 cache_size=_CACHE_SIZE,
+                 stats=False,
+                 offset=0,
+                 missing='error',
+                 missing_value=0):
+        """Encodes a scipy.sparse matrix as a set of ASP Facts. If no feature_names are provided, they will be automatically created as 'f1', 'f2', etc.
+
+        The matrix is converted to CSR (no copy if it already is) and never densified as a whole.
+
+        Args:
+            data (scipy.sparse matrix): data to be encoded.
+            feature_names (Iterable[str], optional): Names for the features/columns. Defaults to None.
+            skip_default (bool, optional): if True, value facts are only produced for the non zero entries of the matrix, walking its CSR structure; zeros (the default value) are left implicit. If False, every cell is encoded, as for dense data. Defaults to True.
+            n_jobs (int, optional): number of processes used for encoding the data as text. -1 means using all the CPUs. Defaults to 1.
+            cache_size (int, optional): maximum number of bytes taken by the cached encodings. 0 disables the cache. Defaults to 1 GiB.
+            stats (bool, optional): if True, the encoding phases are recorded in the 'stats' attribute. Defaults to False.
+            offset (int, optional): index of the first instance. Defaults to 0.
+            missing, missing_value: policy for stored nan entries, see Encoder. Implicit zeros are never missing.
+        """
+        self.skip_default = skip_default
+        super().__init__(data.tocsr(),
+                         feature_names=feature_names,
+                         factor=factor,
+                         numerical_columns=numerical_columns,
+                         n_jobs=n_jobs,
+                         cache_size=cache_size,
+                         stats=stats,
+                         offset=offset,
+                         missing=missing,
+                         missing_value=missing_value)
+
+    def _n_source_rows(self):
+        return self._data.shape[0]
+
+    def _find_categorical(self):
+        return [False] * self._n_columns()
+
+    def _iter_source_blocks(self, block_size=_BLOCK_SIZE):
+        n_rows = self._data.shape[0]
+        for start in range(0, n_rows, block_size):
+            block = self._data[start:start + block_size]
+            if self.skip_default:
+                yield start, block
+            else:
+                block = block.toarray()
+                yield start, [block[:, j] for j in range(block.shape[1])]
+
+    @property
+    def data(self):
+        """The data being encoded, as a CSR matrix including the appended rows."""
+        if not self._appended:
+            return self._data
+        from scipy.sparse import csr_matrix, vstack
+        return vstack([self._data] + [
+            csr_matrix(column_stack(columns)) for columns in self._appended
+        ]).tocsr()
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+
+    def _sparse_block(self, columns, layout):
+        """Returns a block of rows as a CSR matrix, or None when every cell must be encoded. The
+        row layout always encodes every cell."""
+        if not isinstance(columns, list):
+            return columns
+        if not self.skip_default or layout == 'row':
+            return None
+        from scipy.sparse import csr_matrix
+        return csr_matrix(column_stack(columns))
+
+    def _cells(self, start, block, factor):
+        """Returns the CSR row pointers, columns and encoded values of the cells of a block whose
+        encoded value is not zero. Stored nan entries follow the missing values policy: under
+        'fact', their column is shifted by the number of columns."""
+        block = block.copy()
+        block.sum_duplicates()
+        numerical = asarray(self._numerical_columns, dtype=bool)[block.indices]
+        values = block.data
+        cell_rows = repeat(arange(block.shape[0]), diff(block.indptr))
+        missing = _missing_mask(values)
+        if missing is not None and self.missing == 'error':
+            k = int(missing.argmax())
+            raise ValueError(
+                f"Missing value in column '{self.feature_names[block.indices[k]]}' of instance {start + cell_rows[k]}. Use 'missing' to skip, replace or mark missing values."
+            )
+        mult = 10**factor
+        if values.dtype.kind in 'biu' and factor >= 0:
+            values = values.astype(int64) * where(numerical, mult, 1)
+        else:
+            with errstate(invalid='ignore'):
+                values = where(numerical, rint(values * mult), trunc(values))
+            invalid = _non_ints(values)
+            if missing is not None:
+                invalid &= ~missing
+            if invalid.any():
+                k = int(invalid.argmax())
+                raise ValueError(
+                    f"Value {values[k]} in column '{self.feature_names[block.indices[k]]}' of instance {start + cell_rows[k]} cannot be encoded as an int."
+                )
+            with errstate(invalid='ignore'):
+                values = values.astype(int64)
+        indices = block.indices
+        kept = values != 0
+        if missing is not None:
+            if self.missing == 'skip':
+                kept &= ~missing
+            else:
+                kept |= missing
+                if self.missing == 'sentinel':
+                    values[missing] = self.missing_value
+                else:
+                    indices = indices + block.shape[1] * missing
+        row_counts = bincount(cell_rows[kept], minlength=block.shape[0])
+        indptr = concatenate(([0], cumsum(row_counts))).astype(int64)
+        return indptr, indices[kept], values[kept]
+
+    def _dense_columns(self, columns):
+        """Returns a block of rows as one 1D array per column."""
+        if isinstance(columns, list):
+            return columns
+        block = columns.toarray()
+        return [block[:, j] for j in range(block.shape[1])]
+
+    def _text_block(self, start, columns, feature_names, factor,
+                    instance_func, value_func, layout='default'):
+        if layout == 'row':
+            columns = self._dense_columns(columns)
+        block = self._sparse_block(columns, layout)
+        if block is None:
+            return super()._text_block(start, columns, feature_names, factor,
+                                       instance_func, value_func, layout)
+        indptr, indices, values = self._cells(start, block, factor)
+        templates = _value_templates(feature_names, value_func,
+                                     [False] * len(feature_names), layout)
+        if self.missing == 'fact':
+            n_columns = len(feature_names)
+            templates += _missing_templates(feature_names, layout)
+            missing = indices >= n_columns
+            if missing.any():
+                if layout != 'feature_id':
+                    values = values.astype(object)
+                values[missing] = _missing_features(
+                    feature_names, layout)[indices[missing] - n_columns]
+        return _format_rows(start, indptr, indices, values,
+                            _instance_template(instance_func),
+                            templates), len(indptr) - 1 + len(indices)
+
+    def _fact_block(self, start, columns, fname_symbols, factor,
+                    instance_func, value_func, string_symbols,
+                    layout='default'):
+        if layout == 'row':
+            columns = self._dense_columns(columns)
+        block = self._sparse_block(columns, layout)
+        if block is None:
+            return super()._fact_block(start, columns, fname_symbols, factor,
+                                       instance_func, value_func,
+                                       string_symbols, layout)
+        from clingo import Function, Number, String
+        indptr, indices, values = self._cells(start, block, factor)
+        indptr, indices, values = indptr.tolist(), indices.tolist(
+        ), values.tolist()
+        n_columns = len(fname_symbols)
+        if layout == 'predicate':
+            references = [String(fname) for fname in fname_symbols]
+        else:
+            references = fname_symbols
+        # Each distinct value of the block is turned into a symbol once
+        numbers = {}
+        block_facts = []
+        for r in range(len(indptr) - 1):
+            index = Number(start + r)
+            block_facts.append(Function(instance_func, [index]))
+            for k in range(indptr[r], indptr[r + 1]):
+                if indices[k] >= n_columns:
+                    block_facts.append(
+                        Function(_MISSING_FUNC,
+                                 [index, references[indices[k] - n_columns]],
+                                 True))
+                    continue
+                val = values[k]
+                if val not in numbers:
+                    numbers[val] = Number(val)
+                if layout == 'predicate':
+                    block_facts.append(
+                        Function(fname_symbols[indices[k]],
+                                 [index, numbers[val]], True))
+                else:
+                    block_facts.append(
+                        Function(value_func,
+                                 [index, fname_symbols[indices[k]], numbers[val]],
+                                 True))
+        return block_facts
@@ -0,0 +1,116 @@
+from contextlib import contextmanager
+import sys
+from time import perf_counter
+
+# Phases of an encoding, in the order they are reported.
+_PHASES = ('read', 'deduplicate', 'format', 'symbols', 'write', 'backend')
+
+
+def _peak_memory():
+    """Returns the peak resident memory of the process in bytes, or None where it is unknown."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class EncodingStats:
+    def __init__(self):
+        """Instrumentation of the encodings made by an encoder, accumulated over every call.
+
+        Phases:
+            read: reading and parsing the data (csv parsing, loading blocks of rows).
+            deduplicate: finding the distinct rows, when deduplicating.
+            format: formatting rows as text.
+            symbols: building clingo symbols.
+            write: writing programs into file objects.
+            backend: adding facts to a clingo Control.
+
+        Attributes:
+            timings ([Dict[str, float]]): seconds spent in each phase.
+            rows ([int]): number of rows encoded.
+            facts ([int]): number of facts produced.
+            bytes ([int]): number of characters of text produced (bytes for ASCII programs).
+            cache_hits ([int]): number of encodings served from a cache.
+        """
+        self.reset()
+
+    def reset(self):
+        """Discards the recorded measures."""
+        self.timings = {}
+        self.rows = 0
+        self.facts = 0
+        self.bytes = 0
+        self.cache_hits = 0
+
+    @contextmanager
+    def phase(self, name):
+        """Context manager adding the time spent in its block to the given phase."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def add_text(self, text, facts, rows=True):
+        """Records a block of text holding the given number of facts: its lines are rows (unless rows is False)."""
+        if not text:
+            return
+        if rows:
+            self.rows += text.count('\n') + 1
+        self.facts += facts
+        # Blocks of rows are preceded by a line break
+        self.bytes += len(text) + (1 if rows else 0)
+
+    @property
+    def total_time(self):
+        """Seconds spent in all the phases."""
+        return sum(self.timings.values())
+
+    @property
+    def rows_per_second(self):
+        total = self.total_time
+        return self.rows / total if total else 0.0
+
+    @property
+    def peak_memory(self):
+        """Peak resident memory of the process in bytes, or None where it is unknown."""
+        return _peak_memory()
+
+    def as_dict(self):
+        """Returns the measures as a dict, e.g. for logging them as JSON."""
+        return {
+            'timings': dict(self.timings),
+            'total_time': self.total_time,
+            'rows': self.rows,
+            'rows_per_second': self.rows_per_second,
+            'facts': self.facts,
+            'bytes': self.bytes,
+            'cache_hits': self.cache_hits,
+            'peak_memory': self.peak_memory,
+        }
+
+    def __str__(self):
+        lines = [
+            f'{name:<12}{self.timings[name]:10.3f} s'
+            for name in sorted(self.timings,
+                               key=lambda name: (name not in _PHASES,
+                                                 _PHASES.index(name)
+                                                 if name in _PHASES else 0))
+        ]
+        lines.append(f'{"total":<12}{self.total_time:10.3f} s')
+        lines.append(
+            f'{"rows":<12}{self.rows:10d} ({self.rows_per_second:.0f} rows/s)')
+        lines.append(f'{"facts":<12}{self.facts:10d}')
+        lines.append(f'{"bytes":<12}{self.bytes:10d}')
+        lines.append(f'{"cache hits":<12}{self.cache_hits:10d}')
+        peak = self.peak_memory
+        if peak is not None:
+            lines.append(f'{"peak memory":<12}{peak / 2**20:10.1f} MiB')
+        return '\n'.join(lines)
@@ -22,11 +22,11 @@ setuptools.setup(
         'logic programming',
         'answer set programming',
     ],
-    python_requires='>=3.6.0',
+    python_requires='>=3.8.0',
     install_requires=[
         'clingo>=5.5.0.post3',
         'numpy',
         'argparse',
     ],
-    packages=['dafact', 'dafact.encoders'],
+    packages=['dafact', 'dafact.decoders', 'dafact.encoders'],
     entry_points={'console_scripts': ['dafact=dafact.__main__:main']})
@@ -0,0 +1,62 @@
+import pytest
+from numpy import array, nan
+from dafact import Dafacter
+from dafact.encoders import ArrowEncoder, NumpyLikeEncoder
+
+pyarrow = pytest.importorskip('pyarrow')
+
+
+class TestArrowEncoder:
+    @pytest.fixture(scope='class')
+    def table(self):
+        return pyarrow.table({
+            'age': [25, 40, None, 7],
+            'height': [1.72, 1.8, 2.0, 1.5],
+            'color': pyarrow.array(['red', 'blue', None,
+                                    'red']).dictionary_encode(),
+        })
+
+    @pytest.fixture
+    def paths(self, table, tmp_path):
+        from pyarrow import feather, parquet
+        parquet_path = tmp_path / 'data.parquet'
+        parquet.write_table(table, parquet_path, row_group_size=3)
+        ipc_path = tmp_path / 'data.arrow'
+        feather.write_feather(table, ipc_path, chunksize=3)
+        return parquet_path, ipc_path
+
+    def test_encoding(self, paths):
+        expected = NumpyLikeEncoder(array(
+            [[25, 1.72, 'red'], [40, 1.8, 'blue'], [nan, 2.0, nan],
+             [7, 1.5, 'red']],
+            dtype=object),
+                                    feature_names=['age', 'height', 'color'],
+                                    factor=2,
+                                    missing='fact').as_program_string()
+        for path in paths:
+            arrowenc = ArrowEncoder(path, factor=2, missing='fact')
+            assert arrowenc.feature_names == ['age', 'height', 'color']
+            assert arrowenc.data is None
+            assert arrowenc.as_program_string() == expected
+            assert arrowenc.as_program_string().split('\n')[3] == (
+                'instance(2). missing(2,"age"). value(2,"height",200). '
+                'missing(2,"color").')
+
+    def test_usecols(self, paths):
+        for path in paths:
+            arrowenc = ArrowEncoder(path,
+                                    usecols=['color', 1],
+                                    missing='skip')
+            assert arrowenc.as_program_string().split('\n')[:2] == [
+                'feature("color"). feature("height").',
+                'instance(0). value(0,"color","red"). value(0,"height",2).'
+            ]
+            assert arrowenc._n_source_rows() == 4
+
+    def test_dafacter(self, paths):
+        for path in paths:
+            dafacter = Dafacter(str(path), missing='skip', offset=10)
+            assert dafacter.as_program_string().split('\n')[3] == \
+                'instance(12). value(12,"height",2).'
+        with pytest.raises(ValueError):
+            ArrowEncoder(paths[0], file_format='csv')
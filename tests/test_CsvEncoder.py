@@ -1,6 +1,8 @@
 from _pytest.compat import ascii_escaped
 import pytest
-from numpy import array, all, exp
+from importlib.util import find_spec
+from io import StringIO
+from numpy import array, all, exp, isnan
 
 from dafact.encoders import CsvEncoder
 
@@ -52,3 +54,165 @@ class TestCsvEncoder:
                             have_names=False,
                             feature_names=None)
         assert csvenc.feature_names == expected_features
+
+    def test_chunksize(self, datadir):
+        csvenc = CsvEncoder((datadir / "haberman_mini.csv"), have_names=True)
+        for chunksize in (1, 2, 10):
+            chunked = CsvEncoder((datadir / "haberman_mini.csv"),
+                                 have_names=True,
+                                 chunksize=chunksize)
+            assert chunked.data is None
+            assert chunked.feature_names == csvenc.feature_names
+            assert chunked.as_clingo_facts() == csvenc.as_clingo_facts()
+            assert chunked.as_program_string() == csvenc.as_program_string()
+
+    def test_usecols(self, datadir, expected_data):
+        csvenc = CsvEncoder((datadir / "haberman_mini.csv"),
+                            have_names=True,
+                            usecols=["nodes", 0])
+        assert csvenc.feature_names == ["nodes", "age"]
+        assert all(csvenc.data == expected_data[:, [2, 0]])
+
+        csvenc = CsvEncoder((datadir / "haberman_mini_noheaders.csv"),
+                            usecols=[3],
+                            chunksize=2)
+        assert csvenc.feature_names == ["f1"]
+        assert csvenc.as_program_string().splitlines()[1] == \
+            'instance(0). value(0,"f1",1).'
+
+        with pytest.raises(ValueError):
+            CsvEncoder((datadir / "haberman_mini_noheaders.csv"),
+                       usecols=["age"])
+
+    def test_dtype_inference(self, tmp_path):
+        csv_path = tmp_path / "mixed.csv"
+        csv_path.write_text("1,0.5,70000\n2,,3\n")
+        for chunksize in (None, 1):
+            csvenc = CsvEncoder(csv_path,
+                                factor=1,
+                                numerical_columns=[0, 2],
+                                chunksize=chunksize,
+                                missing='skip')
+            # The non numerical column is truncated and its empty cell is missing
+            assert csvenc.as_program_string().split('\n')[1:] == [
+                'instance(0). value(0,"f1",10). value(0,"f2",0). value(0,"f3",700000).',
+                'instance(1). value(1,"f1",20). value(1,"f3",30).',
+            ]
+        assert isnan(CsvEncoder(csv_path).data[1, 1])
+
+    def test_pandas_engine(self, datadir):
+        pytest.importorskip("pandas")
+        for chunksize in (None, 2):
+            csvenc = CsvEncoder((datadir / "haberman_mini.csv"),
+                                have_names=True,
+                                usecols=["survival", "age"],
+                                chunksize=chunksize)
+            pandas_csvenc = CsvEncoder((datadir / "haberman_mini.csv"),
+                                       have_names=True,
+                                       usecols=["survival", "age"],
+                                       chunksize=chunksize,
+                                       engine='pandas')
+            assert pandas_csvenc.as_program_string() == \
+                csvenc.as_program_string()
+
+    def test_categorical_columns(self, tmp_path):
+        csv_path = tmp_path / "categorical.csv"
+        csv_path.write_text("color,size\nred,1\nblue,\nred,3\n")
+        for chunksize in (None, 2):
+            csvenc = CsvEncoder(csv_path,
+                                have_names=True,
+                                chunksize=chunksize,
+                                missing='skip')
+            assert csvenc.as_program_string().split('\n')[1:] == [
+                'instance(0). value(0,"color","red"). value(0,"size",1).',
+                'instance(1). value(1,"color","blue").',
+                'instance(2). value(2,"color","red"). value(2,"size",3).',
+            ]
+        # Empty cells are never encoded as numbers
+        with pytest.raises(ValueError, match="'size' of instance 1"):
+            CsvEncoder(csv_path, have_names=True).as_program_string()
+        csvenc = CsvEncoder(csv_path, have_names=True, missing='skip')
+        colors = csvenc.data[:, 0]
+        assert colors[0] is colors[2]
+
+    def test_column_kinds(self, tmp_path):
+        csv_path = tmp_path / "kinds.csv"
+        # The first column only holds non numerical strings after the first chunk
+        csv_path.write_text("5,1\n6,2\nx,3\n7,4\n")
+        expected = CsvEncoder(csv_path).as_program_string().split('\n')[1:]
+        assert expected == [
+            'instance(0). value(0,"f1","5"). value(0,"f2",1).',
+            'instance(1). value(1,"f1","6"). value(1,"f2",2).',
+            'instance(2). value(2,"f1","x"). value(2,"f2",3).',
+            'instance(3). value(3,"f1","7"). value(3,"f2",4).',
+        ]
+        engines = ['csv'] + (['pandas'] if find_spec('pandas') else [])
+        for engine in engines:
+            for chunksize in (None, 1, 2):
+                csvenc = CsvEncoder(csv_path, chunksize=chunksize, engine=engine)
+                assert csvenc.as_program_string().split('\n')[1:] == expected
+                assert csvenc.categorical_columns == [True, False]
+                assert [str(f) for f in csvenc.as_clingo_facts()[2:5]] == \
+                    expected[0].replace('.', '').split(' ')
+
+        # Columns given as numerical are never categorical
+        for chunksize in (None, 2):
+            csvenc = CsvEncoder(csv_path, numerical_columns=[0], chunksize=chunksize)
+            with pytest.raises(ValueError, match="'f1' is numerical"):
+                csvenc.as_program_string()
+
+    def test_append(self, datadir, expected_data):
+        csvenc = CsvEncoder((datadir / "haberman_mini.csv"),
+                            have_names=True,
+                            chunksize=2)
+        csvenc.append([[40, 60, 2, 2]])
+        assert csvenc.as_program_string().split('\n')[-1] == (
+            'instance(3). value(3,"age",40). value(3,"operation_year",60). '
+            'value(3,"nodes",2). value(3,"survival",2).')
+
+    def test_cache_dir(self, tmp_path):
+        csv_path = tmp_path / "data.csv"
+        csv_path.write_text("a,b\n1,2\n3,4\n")
+        cache_dir = tmp_path / "cache"
+        expected = CsvEncoder(csv_path, have_names=True).as_program_string()
+
+        for cache_by_hash in (False, True):
+            csvenc = CsvEncoder(csv_path,
+                                have_names=True,
+                                cache_dir=cache_dir,
+                                cache_by_hash=cache_by_hash)
+            out = StringIO()
+            csvenc.write_program(out)
+            assert out.getvalue() == expected
+
+            # A new encoder reads the program from the cache, without encoding it
+            csvenc = CsvEncoder(csv_path,
+                                have_names=True,
+                                cache_dir=cache_dir,
+                                cache_by_hash=cache_by_hash)
+            csvenc._iter_text_blocks = None
+            assert csvenc.as_program_string() == expected
+            assert csvenc._columns is None
+        assert len(list(cache_dir.glob('*.lp'))) == 2
+        assert list(CsvEncoder(csv_path, have_names=True,
+                               cache_dir=cache_dir).iter_program_lines()) == \
+            expected.split('\n')
+
+        # Changing the file or the parameters does not reuse the program
+        csv_path.write_text("a,b\n1,2\n3,5\n")
+        csvenc = CsvEncoder(csv_path, have_names=True, cache_dir=cache_dir)
+        assert csvenc.as_program_string().endswith('value(1,"b",5).')
+        assert csvenc.as_program_string(layout='row') == \
+            CsvEncoder(csv_path, have_names=True).as_program_string(layout='row')
+
+        # Least recently used programs are evicted, other files are left untouched
+        rules = cache_dir / "my_rules.lp"
+        rules.write_text('low(I) :- value(I, "a", V), V < 2.\n' * 20)
+        csvenc = CsvEncoder(csv_path,
+                            have_names=True,
+                            cache_dir=cache_dir,
+                            cache_dir_size=150)
+        csvenc.as_program_string(factor=1)
+        assert len(list(cache_dir.glob('*.lp'))) == 2 and rules.exists()
+        csvenc._disk_cache.clear()
+        assert list(cache_dir.glob('*.lp')) == [rules]
@@ -1,8 +1,8 @@
 import pytest
 from numpy import array
-from clingo import Function, String, Number
+from clingo import Control, Function, String, Number
 from dafact import Dafacter
-from numpy import all
+from numpy import all, memmap, save, savez, savez_compressed
 
 
 class TestDafacter:
@@ -57,3 +57,46 @@ class TestDafacter:
     def test_constructor_numpylike(self, custom_data, expected_facts):
         dafacter = Dafacter(custom_data)
         assert dafacter.as_clingo_facts() == expected_facts
+
+    def test_iterators(self, datadir):
+        dafacter = Dafacter((datadir / "haberman_mini.csv"),
+                            have_names=True,
+                            chunksize=2)
+        assert list(dafacter.iter_clingo_facts()) == \
+            dafacter.as_clingo_facts()
+        assert "\n".join(dafacter.iter_program_lines()) == \
+            dafacter.as_program_string()
+
+    def test_add_to_control(self, custom_data, expected_facts):
+        dafacter = Dafacter(custom_data)
+        # Added as text first, then from the cached facts through the backend
+        for cached in (False, True):
+            if cached:
+                dafacter.as_clingo_facts()
+            ctl = Control()
+            dafacter.add_to_control(ctl)
+            ctl.add("base", [], 'big(I) :- value(I, "f1", V), V > 2.')
+            ctl.ground([("base", [])])
+            atoms = [a.symbol for a in ctl.symbolic_atoms]
+            assert set(expected_facts) <= set(atoms)
+            assert Function('big', [Number(1)]) in atoms
+            assert Function('big', [Number(0)]) not in atoms
+            with ctl.solve(yield_=True) as handle:
+                assert set(expected_facts) <= set(next(iter(handle)).symbols(atoms=True))
+
+    def test_constructor_npy(self, custom_data, tmp_path):
+        expected_text = Dafacter(custom_data).as_program_string()
+
+        save(tmp_path / "data.npy", custom_data)
+        dafacter = Dafacter(tmp_path / "data.npy")
+        assert isinstance(dafacter._encoder._data, memmap)
+        assert dafacter.as_program_string() == expected_text
+
+        savez(tmp_path / "data.npz", custom_data)
+        dafacter = Dafacter(str(tmp_path / "data.npz"))
+        assert isinstance(dafacter._encoder._data, memmap)
+        assert dafacter.as_program_string() == expected_text
+
+        savez_compressed(tmp_path / "compressed.npz", custom_data)
+        dafacter = Dafacter(tmp_path / "compressed.npz")
+        assert dafacter.as_program_string() == expected_text
@@ -0,0 +1,69 @@
+import pytest
+from numpy import array, nan
+from numpy.testing import assert_array_equal
+from dafact import Decoder
+from dafact.encoders import NumpyLikeEncoder
+
+
+class TestDecoder:
+
+    @pytest.fixture(scope='class')
+    def data(self):
+        return array([[25.0, 1.72, 'red'], [40.0, 1.8, 'blue'], [nan, 2.0, nan],
+                      [7.0, 1.5, 'red']],
+                     dtype=object)
+
+    @pytest.fixture(scope='class')
+    def encoder(self, data):
+        return NumpyLikeEncoder(data,
+                                feature_names=['age', 'height', 'color'],
+                                factor=2,
+                                missing='skip')
+
+    def test_layouts(self, data, encoder):
+        for layout in ('default', 'feature_id', 'predicate'):
+            decoder = Decoder(factor=2, layout=layout)
+            program = encoder.as_program_string(layout=layout)
+            # Object arrays are compared as text, so nan equals nan
+            assert_array_equal(
+                decoder.decode_text(program).astype(str), data.astype(str))
+            facts = encoder.as_clingo_facts(layout=layout)
+            assert_array_equal(
+                decoder.decode_symbols(facts).astype(str), data.astype(str))
+
+        program = NumpyLikeEncoder(array([[1, 2], [3, 4]])).as_program_string(
+            layout='row')
+        assert_array_equal(
+            Decoder(layout='row').decode_text(program), [[1, 2], [3, 4]])
+
+    def test_model_atoms(self):
+        decoder = Decoder(feature_names=['a', 'b'])
+        decoded = decoder.decode_text(
+            'instance(3) value(1,"b",-2) value(1,"a",5) myvalue(2,"a",1) -value(2,"a",1)'
+        )
+        assert decoded.dtype.kind == 'f'
+        assert_array_equal(decoded, [[5, -2], [nan, nan]])
+        with pytest.raises(ValueError):
+            decoder.decode_text('value(1,"c",1)')
+        with pytest.raises(ValueError):
+            Decoder(layout='column')
+
+    def test_counts(self):
+        encoder = NumpyLikeEncoder(array([[1, 2], [3, 4], [1, 2]]),
+                                   deduplicate=True)
+        decoded = Decoder(counts=True).decode_text(encoder.as_program_string())
+        assert decoded.dtype.kind == 'i'
+        assert_array_equal(decoded, [[1, 2], [1, 2], [3, 4]])
+
+    def test_as_frame(self, data):
+        pytest.importorskip('pandas')
+        encoder = NumpyLikeEncoder(data,
+                                   feature_names=['age', 'height', 'color'],
+                                   factor=2,
+                                   missing='skip',
+                                   offset=10)
+        frame = Decoder(factor=2).decode_text(encoder.as_program_string(),
+                                              as_frame=True)
+        assert list(frame.columns) == ['age', 'height', 'color']
+        assert list(frame.index) == [10, 11, 12, 13]
+        assert frame.loc[11, 'color'] == 'blue'
@@ -1,6 +1,8 @@
 from _pytest.fixtures import pytest_sessionstart
+import asyncio
 import pytest
-from numpy import zeros, all, array
+from io import StringIO
+from numpy import zeros, all, array, nan
 from clingo import Function, String, Number
 from dafact.encoders import Encoder
 
@@ -179,3 +181,321 @@ class TestEncoder:
         assert enc.as_program_string(
             feature_names=["hola", "buenas", "tardes"]) == (
                 datadir / 'expected_text2.lp').read_text()
+
+    def test_as_program_string_matches_clingo_facts(self, custom_decimal_data):
+        enc = Encoder(-custom_decimal_data,
+                      feature_names=['a"b', 'c\\d', '50%', 'e\nf'],
+                      factor=2,
+                      numerical_columns=[0, 1, 2])
+        clingo_facts = enc.as_clingo_facts(instance_func='ins')
+        text = enc.as_program_string(instance_func='ins')
+        assert text.replace('\n', ' ').split(' ') == [
+            str(f) + '.' for f in clingo_facts
+        ]
+
+    def test_iterators(self, custom_data, expected_facts, datadir):
+        enc = Encoder(custom_data)
+        facts = enc.iter_clingo_facts()
+        assert next(facts) == expected_facts[0]
+        assert list(facts) == expected_facts[1:]
+
+        lines = list(enc.iter_program_lines())
+        assert lines == (datadir / 'expected_text.lp').read_text().split('\n')
+
+    def test_write_program(self, custom_data, datadir):
+        enc = Encoder(custom_data)
+        out = StringIO()
+        enc.write_program(out)
+        assert out.getvalue() == (datadir / 'expected_text.lp').read_text()
+
+        # Served from the text cache
+        enc.as_program_string(feature_names=["hola", "buenas", "tardes"])
+        out = StringIO()
+        enc.write_program(out, feature_names=["hola", "buenas", "tardes"])
+        assert out.getvalue() == (datadir / 'expected_text2.lp').read_text()
+
+    def test_cache(self, custom_data, expected_facts):
+        enc = Encoder(custom_data)
+        facts = enc.as_clingo_facts()
+        text = enc.as_program_string(factor=2)
+        # Alternating configurations are served from the cache
+        assert enc.as_clingo_facts() is facts
+        assert enc.as_program_string(factor=2) is text
+        assert enc.as_program_string() != text
+
+        # Text calls do not change the parameters of the cached facts
+        assert enc.as_clingo_facts() == expected_facts
+
+        enc.clear_cache()
+        assert enc.as_clingo_facts() is not facts
+
+        # Least recently used encodings are evicted when over the budget
+        enc = Encoder(custom_data, cache_size=len(text) + 100)
+        text0 = enc.as_program_string()
+        assert enc.as_program_string() is text0
+        enc.as_program_string(factor=2)
+        assert enc.as_program_string() is not text0
+
+        # No caching at all
+        enc = Encoder(custom_data, cache_size=0)
+        assert enc.as_clingo_facts() is not enc.as_clingo_facts()
+
+    def test_categorical_columns(self):
+        data = array([["red", 1.5], ["blue", 2], ["red", 3]], dtype=object)
+        enc = Encoder(data, factor=1)
+        facts = enc.as_clingo_facts()
+        assert facts[2:5] == [
+            Function('instance', [Number(0)], True),
+            Function('value', [Number(0), String('f1'),
+                               String('red')], True),
+            Function('value', [Number(0), String('f2'),
+                               Number(15)], True),
+        ]
+        assert enc.as_program_string().split('\n')[2] == \
+            'instance(1). value(1,"f1","blue"). value(1,"f2",20).'
+        assert enc.as_program_string().replace('\n', ' ').split(' ') == [
+            str(f) + '.' for f in facts
+        ]
+
+        # Kinds are decided over the whole data, not block by block
+        data = array([['5', 1]] * 10000 + [['x', 2]], dtype=object)
+        enc = Encoder(data)
+        assert enc.categorical_columns == [True, False]
+        lines = enc.as_program_string().split('\n')
+        assert lines[1] == 'instance(0). value(0,"f1","5"). value(0,"f2",1).'
+        assert lines[-1] == 'instance(10000). value(10000,"f1","x"). value(10000,"f2",2).'
+        enc.append([[6, 3]])
+        assert enc.as_program_string().split('\n')[-1] == \
+            'instance(10001). value(10001,"f1","6"). value(10001,"f2",3).'
+        with pytest.raises(ValueError, match="'f2' is numerical"):
+            enc.append([['7', 'y']])
+        with pytest.raises(ValueError, match="'f1' is numerical"):
+            Encoder(data, numerical_columns=[0]).as_clingo_facts()
+
+    def test_append(self, custom_data, expected_facts):
+        enc = Encoder(custom_data[:1])
+        facts = enc.as_clingo_facts()
+        text = enc.as_program_string(value_func='val')
+        delta = enc.append(custom_data[1:], return_facts=True)
+        assert delta == expected_facts[7:]
+        # Results returned before the append are left untouched
+        assert facts == expected_facts[:7]
+        assert text == Encoder(custom_data[:1]).as_program_string(
+            value_func='val')
+        facts = enc.as_clingo_facts()
+        assert facts == expected_facts
+        assert enc.as_clingo_facts() is facts
+        assert enc.as_program_string(value_func='val') == \
+            Encoder(custom_data).as_program_string(value_func='val')
+        assert all(enc.data == custom_data)
+
+        assert enc.append([7, 8, 9]) is None
+        assert enc.as_program_string().split('\n')[-1] == \
+            'instance(2). value(2,"f1",7). value(2,"f2",8). value(2,"f3",9).'
+        with pytest.raises(ValueError):
+            enc.append([[1, 2]])
+
+    def test_layouts(self, custom_data):
+        enc = Encoder(custom_data, feature_names=['age', 'height', 'weight'])
+        assert enc.as_program_string(layout='feature_id') == (
+            'feature(0,"age"). feature(1,"height"). feature(2,"weight").\n'
+            'instance(0). value(0,0,1). value(0,1,2). value(0,2,3).\n'
+            'instance(1). value(1,0,4). value(1,1,5). value(1,2,6).')
+        assert enc.as_program_string(layout='row') == (
+            'feature(0,"age"). feature(1,"height"). feature(2,"weight").\n'
+            'instance(0). value(0,1,2,3).\n'
+            'instance(1). value(1,4,5,6).')
+        assert enc.as_program_string(layout='predicate') == (
+            'feature("age"). feature("height"). feature("weight").\n'
+            'instance(0). age(0,1). height(0,2). weight(0,3).\n'
+            'instance(1). age(1,4). height(1,5). weight(1,6).')
+        for layout in ('default', 'feature_id', 'row', 'predicate'):
+            text = enc.as_program_string(layout=layout)
+            facts = enc.as_clingo_facts(layout=layout)
+            assert text.replace('\n', ' ').split(' ') == [
+                f'{fact}.' for fact in facts
+            ]
+            enc.append([7, 8, 9])
+            assert enc.as_program_string(layout=layout) == \
+                Encoder(enc.data, feature_names=enc.feature_names).as_program_string(layout=layout)
+
+        with pytest.raises(ValueError):
+            enc.as_program_string(layout='wide')
+        with pytest.raises(ValueError):
+            Encoder(custom_data).as_clingo_facts(layout='predicate',
+                                                 feature_names=['a', 'B', 'c'])
+        with pytest.raises(ValueError, match="'not'"):
+            Encoder(custom_data).as_program_string(layout='predicate',
+                                                   feature_names=['a', 'not', 'c'])
+
+    def test_bins(self):
+        data = array([[0.5, 10], [1.5, 20], [2.5, 30], [9.5, 40]])
+        enc = Encoder(data, bins=2)
+        assert enc.as_program_string().split('\n')[1:] == [
+            'instance(0). value(0,"f1",0). value(0,"f2",0).',
+            'instance(1). value(1,"f1",0). value(1,"f2",0).',
+            'instance(2). value(2,"f1",0). value(2,"f2",1).',
+            'instance(3). value(3,"f1",1). value(3,"f2",1).',
+        ]
+        enc = Encoder(data, bins=2, bin_strategy='quantile')
+        assert [f.arguments[2].number for f in enc.as_clingo_facts()
+                if f.name == 'value' and f.arguments[1] == String('f1')] == [0, 0, 1, 1]
+
+        enc = Encoder(data, factor=1, bins={'f1': [1, 2]}, bin_mode='append')
+        assert enc.as_program_string().split('\n')[0] == \
+            'feature("f1"). feature("f2"). feature("f1_bin").'
+        assert enc.as_program_string().split('\n')[2] == \
+            'instance(1). value(1,"f1",15). value(1,"f2",200). value(1,"f1_bin",1).'
+        enc.append([[1, 0]])
+        assert enc.as_program_string().split('\n')[-1] == \
+            'instance(4). value(4,"f1",10). value(4,"f2",0). value(4,"f1_bin",1).'
+
+        # Bins given for every column skip the categorical ones, unless named
+        data = array([[0.5, 'a'], [1.5, 'b'], [9.5, 'a']], dtype=object)
+        enc = Encoder(data, bins=2, bin_mode='append')
+        assert enc.as_program_string().split('\n')[::3] == [
+            'feature("f1"). feature("f2"). feature("f1_bin").',
+            'instance(2). value(2,"f1",10). value(2,"f2","a"). value(2,"f1_bin",1).',
+        ]
+        with pytest.raises(ValueError, match="'f2' cannot be binned"):
+            Encoder(data, bins={'f2': 2}).as_program_string()
+
+        with pytest.raises(ValueError):
+            Encoder(data, bins={5: 2})
+        with pytest.raises(ValueError):
+            Encoder(data, bins=0)
+        with pytest.raises(ValueError):
+            Encoder(data, bins=2, bin_strategy='kmeans')
+
+    def test_async(self, custom_data, expected_facts):
+        enc = Encoder(custom_data)
+        text = enc.as_program_string(value_func='val')
+
+        class AsyncWriter:
+            chunks = []
+
+            async def write(self, chunk):
+                self.chunks.append(chunk)
+
+        async def encode():
+            writer = AsyncWriter()
+            await enc.awrite_program(writer, value_func='val')
+            return (await enc.aencode_program(value_func='val'),
+                    await enc.aencode_facts(),
+                    [line async for line in enc.aiter_program_lines(value_func='val')],
+                    [fact async for fact in enc.aiter_clingo_facts()],
+                    ''.join(writer.chunks))
+
+        program, facts, lines, iter_facts, written = asyncio.run(encode())
+        assert program == text and written == text
+        assert lines == text.split('\n')
+        assert facts == iter_facts == expected_facts
+
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(1) as executor, \
+                pytest.raises(ValueError, match='thread executor'):
+            asyncio.run(enc.aencode_program(executor=executor))
+
+    def test_stats(self, custom_data):
+        enc = Encoder(custom_data, stats=True)
+        text = enc.as_program_string()
+        assert enc.stats.rows == 2
+        assert enc.stats.facts == 11
+        assert enc.stats.bytes == len(text)
+        assert set(enc.stats.timings) == {'read', 'format'}
+        enc.as_program_string()
+        assert enc.stats.cache_hits == 1
+        enc.as_clingo_facts()
+        assert enc.stats.rows == 4 and enc.stats.facts == 22
+        assert 'symbols' in enc.stats.timings
+        assert enc.stats.as_dict()['rows_per_second'] > 0
+        assert 'rows' in str(enc.stats)
+        assert Encoder(custom_data).stats is None
+
+        # Facts are counted as they are encoded, not by parsing the text
+        enc = Encoder(array([['a).b', 1], ['c', nan]], dtype=object),
+                      missing='skip',
+                      deduplicate=True,
+                      origins=True,
+                      stats=True)
+        enc.as_program_string()
+        assert enc.stats.facts == 2 + 2 + 3 + 2 + 2
+
+    def test_offset(self, custom_data):
+        enc = Encoder(custom_data, offset=10)
+        assert enc.as_program_string().split('\n')[1:] == [
+            'instance(10). value(10,"f1",1). value(10,"f2",2). value(10,"f3",3).',
+            'instance(11). value(11,"f1",4). value(11,"f2",5). value(11,"f3",6).',
+        ]
+        assert enc.as_clingo_facts()[3] == Function('instance', [Number(10)], True)
+        enc.append([7, 8, 9])
+        assert enc.as_program_string().split('\n')[-1].startswith('instance(12).')
+
+    def test_missing(self):
+        data = array([[1, nan, 3], [nan, 5, 6]])
+        with pytest.raises(ValueError, match="'f2' of instance 0"):
+            Encoder(data).as_program_string()
+        with pytest.raises(ValueError):
+            Encoder(data, missing='skip').as_program_string(layout='row')
+        expected = {
+            'skip': [
+                'instance(0). value(0,"f1",1). value(0,"f3",3).',
+                'instance(1). value(1,"f2",5). value(1,"f3",6).',
+            ],
+            'sentinel': [
+                'instance(0). value(0,"f1",1). value(0,"f2",-1). value(0,"f3",3).',
+                'instance(1). value(1,"f1",-1). value(1,"f2",5). value(1,"f3",6).',
+            ],
+            'fact': [
+                'instance(0). value(0,"f1",1). missing(0,"f2"). value(0,"f3",3).',
+                'instance(1). missing(1,"f1"). value(1,"f2",5). value(1,"f3",6).',
+            ],
+        }
+        for missing, lines in expected.items():
+            enc = Encoder(data, missing=missing, missing_value=-1)
+            assert enc.as_program_string().split('\n')[1:] == lines
+            assert [str(f) for f in enc.as_clingo_facts()[3:]] == \
+                ' '.join(lines).replace('.', '').split(' ')
+        enc = Encoder(data, missing='fact')
+        assert enc.as_program_string(layout='feature_id').split('\n')[2] == \
+            'instance(1). missing(1,0). value(1,1,5). value(1,2,6).'
+
+    def test_non_finite(self):
+        data = array([[1.5, 2], [float('inf'), nan]])
+        for missing in ('skip', 'fact', 'sentinel'):
+            enc = Encoder(data, factor=1, missing=missing)
+            with pytest.raises(ValueError, match="'f1' of instance 1"):
+                enc.as_program_string()
+            with pytest.raises(ValueError, match="'f1' of instance 1"):
+                enc.as_clingo_facts()
+        with pytest.raises(ValueError):
+            Encoder(array([[1e30]]), factor=0).as_program_string()
+
+    def test_deduplicate(self):
+        data = array([[1.01, 2, 3], [1, 2, 3], [4, 5, 6], [1, 2, 3.2]])
+        enc = Encoder(data, deduplicate=True, origins=True, offset=1)
+        assert enc.as_program_string().split('\n')[1:] == [
+            'instance(1). value(1,"f1",1). value(1,"f2",2). value(1,"f3",3). '
+            'count(1,3). origin(1,0). origin(1,1). origin(1,3).',
+            'instance(2). value(2,"f1",4). value(2,"f2",5). value(2,"f3",6). '
+            'count(2,1). origin(2,2).',
+        ]
+        for layout in ('default', 'row'):
+            text = enc.as_program_string(layout=layout)
+            assert text.replace('\n', ' ').split(' ') == [
+                f'{fact}.' for fact in enc.as_clingo_facts(layout=layout)
+            ]
+        # Rows with missing cells, whose facts vary from row to row
+        skipped = Encoder(array([[1, nan], [1, nan], [2, 3]]),
+                          missing='skip',
+                          deduplicate=True,
+                          origins=True)
+        assert skipped.as_program_string().replace('\n', ' ').split(' ')[2:] == [
+            f'{fact}.' for fact in skipped.as_clingo_facts()[2:]
+        ]
+        # Rows are distinct with a greater factor
+        assert enc.as_program_string(factor=2).count('count(') == 4
+        enc.append([4, 5, 6])
+        assert enc.as_program_string().endswith('count(2,2). origin(2,2). origin(2,4).')
+        with pytest.raises(ValueError):
+            enc.append([4, 5, 6], return_facts=True)
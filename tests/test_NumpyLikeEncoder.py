@@ -1,6 +1,6 @@
 from clingo.symbol import Function
 import pytest
-from numpy import array
+from numpy import arange, array
 from dafact.encoders import NumpyLikeEncoder
 from clingo import Function, String, Number
 
@@ -35,4 +35,31 @@ class TestNumpyLikeEncoder:
     def test_as_program_string(self, custom_data, datadir):
         npenc = NumpyLikeEncoder(custom_data)
         assert npenc.as_program_string() == (datadir / 'expected_text.lp').read_text()
- 
\ No newline at end of file
+ 
+    def test_n_jobs(self):
+        data = arange(30000 * 3).reshape(30000, 3) / 7
+        npenc = NumpyLikeEncoder(data, factor=2)
+        parallel_npenc = NumpyLikeEncoder(data, factor=2, n_jobs=2)
+        assert parallel_npenc.as_program_string() == npenc.as_program_string()
+
+    def test_dataframe(self):
+        pandas = pytest.importorskip('pandas')
+        frame = pandas.DataFrame({
+            'age': [25, 40],
+            'height': [1.72, 1.8],
+            'color': pandas.Categorical(['red', 'blue']),
+            'city': ['Paris', 'Rome'],
+            'code': pandas.array([3, 4], dtype='Int64'),
+            'flag': [True, False],
+        })
+        npenc = NumpyLikeEncoder(frame, factor=2)
+        assert npenc.feature_names == list(frame.columns)
+        # Columns keep their own dtype instead of being converted into an object matrix
+        assert npenc._columns[0] is not None and npenc._columns[0].dtype == frame['age'].dtype
+        assert npenc.as_program_string().split('\n')[1] == (
+            'instance(0). value(0,"age",2500). value(0,"height",172). '
+            'value(0,"color","red"). value(0,"city","Paris"). '
+            'value(0,"code",300). value(0,"flag",100).')
+        assert npenc.as_program_string() == NumpyLikeEncoder(
+            frame.to_numpy(), feature_names=list(frame.columns),
+            factor=2).as_program_string()
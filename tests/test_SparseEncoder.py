@@ -0,0 +1,89 @@
+import pytest
+from numpy import array, nan
+from dafact.encoders import NumpyLikeEncoder, SparseEncoder
+from clingo import Function, String, Number
+
+sparse = pytest.importorskip('scipy.sparse')
+
+
+class TestSparseEncoder:
+
+    @pytest.fixture(scope='class')
+    def dense_data(self):
+        return array([[1, 0, 3], [0, 0, 0], [0, 5, 0]])
+
+    def test_as_clingo_facts(self, dense_data):
+        spenc = SparseEncoder(sparse.csr_matrix(dense_data))
+        assert spenc.as_clingo_facts() == [
+            Function('feature', [String('f1')], True),
+            Function('feature', [String('f2')], True),
+            Function('feature', [String('f3')], True),
+            Function('instance', [Number(0)], True),
+            Function('value', [Number(0), String('f1'), Number(1)], True),
+            Function('value', [Number(0), String('f3'), Number(3)], True),
+            Function('instance', [Number(1)], True),
+            Function('instance', [Number(2)], True),
+            Function('value', [Number(2), String('f2'), Number(5)], True),
+        ]
+
+    def test_as_program_string(self, dense_data):
+        spenc = SparseEncoder(sparse.coo_matrix(dense_data))
+        assert spenc.as_program_string() == (
+            'feature("f1"). feature("f2"). feature("f3").\n'
+            'instance(0). value(0,"f1",1). value(0,"f3",3).\n'
+            'instance(1).\n'
+            'instance(2). value(2,"f2",5).')
+
+    def test_no_skip_default(self, dense_data):
+        spenc = SparseEncoder(sparse.csr_matrix(dense_data), skip_default=False)
+        npenc = NumpyLikeEncoder(dense_data)
+        assert spenc.as_program_string() == npenc.as_program_string()
+        assert spenc.as_clingo_facts() == npenc.as_clingo_facts()
+
+    def test_text_matches_facts(self):
+        data = sparse.random(2500, 40, density=0.05, format='csr',
+                             random_state=0)
+        spenc = SparseEncoder(data, factor=2, numerical_columns=range(20))
+        text = spenc.as_program_string()
+        facts = spenc.as_clingo_facts()
+        assert text.split() == [f'{fact}.' for fact in facts]
+        dense_facts = NumpyLikeEncoder(data.toarray(),
+                                       factor=2,
+                                       numerical_columns=range(20)).as_clingo_facts()
+        assert facts == [
+            fact for fact in dense_facts
+            if fact.name != 'value' or fact.arguments[2] != Number(0)
+        ]
+
+    def test_append(self, dense_data):
+        spenc = SparseEncoder(sparse.csr_matrix(dense_data))
+        spenc.as_program_string()
+        spenc.append([[0, 7, 0]])
+        assert spenc.as_program_string().endswith(
+            '\ninstance(3). value(3,"f2",7).')
+        assert spenc.data.shape == (4, 3)
+
+    def test_layouts(self, dense_data):
+        spenc = SparseEncoder(sparse.csr_matrix(dense_data))
+        assert spenc.as_program_string(layout='predicate').split('\n')[1] == \
+            'instance(0). f1(0,1). f3(0,3).'
+        assert spenc.as_program_string(layout='row').split('\n')[2] == \
+            'instance(1). value(1,0,0,0).'
+        for layout in ('feature_id', 'row', 'predicate'):
+            text = spenc.as_program_string(layout=layout)
+            assert text.replace('\n', ' ').split(' ') == [
+                f'{fact}.' for fact in spenc.as_clingo_facts(layout=layout)
+            ]
+
+    def test_missing(self):
+        matrix = sparse.csr_matrix(array([[0, nan, 2], [1, 0, 0]]))
+        with pytest.raises(ValueError, match="'f2' of instance 0"):
+            SparseEncoder(matrix).as_program_string()
+        spenc = SparseEncoder(matrix, missing='fact')
+        assert spenc.as_program_string().split('\n')[1] == \
+            'instance(0). missing(0,"f2"). value(0,"f3",2).'
+        assert spenc.as_clingo_facts()[4] == Function(
+            'missing', [Number(0), String('f2')])
+        spenc = SparseEncoder(matrix, missing='skip')
+        assert spenc.as_program_string().split('\n')[1] == \
+            'instance(0). value(0,"f3",2).'
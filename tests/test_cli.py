@@ -0,0 +1,79 @@
+import sys
+import pytest
+from dafact.__main__ import main
+
+
+def run(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['dafact', *map(str, args)])
+    main()
+
+
+class TestCli:
+    @pytest.fixture
+    def shards(self, tmp_path):
+        shards = tmp_path / 'shards'
+        shards.mkdir()
+        (shards / 'a.csv').write_text('x,y\n1,2\n3,4\n')
+        (shards / 'b.csv').write_text('x,y\n5,6\n')
+        (shards / 'notes.txt').write_text('not an input\n')
+        return shards
+
+    def test_single_file(self, monkeypatch, shards, tmp_path):
+        run(monkeypatch, shards / 'a.csv', tmp_path / 'a.lp', '--have-names')
+        assert (tmp_path / 'a.lp').read_text() == (
+            'feature("x"). feature("y").\n'
+            'instance(0). value(0,"x",1). value(0,"y",2).\n'
+            'instance(1). value(1,"x",3). value(1,"y",4).')
+
+    def test_concatenated(self, monkeypatch, shards, tmp_path):
+        run(monkeypatch, shards, tmp_path / 'all.lp', '--have-names')
+        lines = (tmp_path / 'all.lp').read_text().split('\n')
+        assert len(lines) == 5
+        assert lines[4] == 'instance(2). value(2,"x",5). value(2,"y",6).'
+
+        run(monkeypatch, shards / '*.csv', tmp_path / 'glob.lp', '--have-names')
+        assert (tmp_path / 'glob.lp').read_text() == \
+            (tmp_path / 'all.lp').read_text()
+
+    def test_refused_output(self, monkeypatch, shards, tmp_path):
+        before = (shards / 'b.csv').read_text()
+        # As given by a shell expanding shards/*.csv
+        for args in ((shards / 'a.csv', shards / 'b.csv'),
+                     (shards / 'a.csv', tmp_path / 'new.csv.gz'),
+                     (shards / '*.csv', shards / 'b.csv')):
+            with pytest.raises(SystemExit):
+                run(monkeypatch, *args, '--have-names')
+        assert (shards / 'b.csv').read_text() == before
+        assert not (tmp_path / 'new.csv.gz').exists()
+
+        with pytest.raises(SystemExit):
+            run(monkeypatch, shards, tmp_path / 'all.lp', '--deduplicate',
+                '--origins')
+        run(monkeypatch, shards / 'a.csv', tmp_path / 'a.lp', '--deduplicate',
+            '--origins')
+        assert 'origin(0,0).' in (tmp_path / 'a.lp').read_text()
+
+    @pytest.mark.parametrize('jobs', [1, 2])
+    def test_output_dir(self, monkeypatch, shards, tmp_path, jobs):
+        manifest = tmp_path / 'manifest.txt'
+        manifest.write_text('shards/b.csv\nshards/a.csv\n')
+        out = tmp_path / 'out'
+        run(monkeypatch, '--manifest', manifest, '--output-dir', out,
+            '--have-names', '--jobs', jobs)
+        assert sorted(p.name for p in out.iterdir()) == ['a.lp', 'b.lp']
+        assert (out / 'b.lp').read_text().split('\n')[1] == \
+            'instance(0). value(0,"x",5). value(0,"y",6).'
+
+    def test_cache_dir(self, monkeypatch, shards, tmp_path):
+        cache_dir = tmp_path / 'cache'
+        cache_dir.mkdir()
+        (cache_dir / 'rules.lp').write_text('a :- b.\n' * 100)
+        for _ in range(2):
+            run(monkeypatch, shards / 'a.csv', tmp_path / 'a.lp', '--have-names',
+                '--cache-dir', cache_dir, '--cache-by-hash')
+        assert len(list(cache_dir.glob('*.lp'))) == 2
+        # Programs are evicted down to --cache-dir-size, other files are kept
+        run(monkeypatch, shards / 'b.csv', tmp_path / 'b.lp', '--have-names',
+            '--cache-dir', cache_dir, '--cache-dir-size', 10)
+        assert [p.name for p in cache_dir.glob('*.lp')] == ['rules.lp']
+        assert (cache_dir / 'rules.lp').read_text() == 'a :- b.\n' * 100